@@ -5,15 +5,42 @@ import cv2
 import sys
 import platform
 import threading
-import mss
+import os
+
+# Shared modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Latency import measure_input_latency, summarize_latency, format_latency
+from Common.Recording import FrameRecorder
+from Common.ScreenCapture import create_capture
+from Common.EventLog import EventLog
+from Common.DetectorScheduler import DetectorScheduler
+from Common.Outcomes import OutcomeLog
+from Common.Profiles import profile_path, load_profile, save_profile, settings_profile, apply_settings, profile_id, ProfileWatcher
 
 # Configuration variables
+GAME_NAME = 'BeanCounter'
+ROOM_NAME = 'CoffeeShop'  # Room the game is entered from
 GAME_REGION = None  # Will be set by calibration
 START_KEY = 'f8'    # Key to start/stop the bot
 PAUSE_KEY = 'f10'   # Key to pause/unpause the bot
 DEBUG_KEY = 'd'     # Key to toggle debug mode
 QUIT_KEY = 'q'      # Key to quit program
+LATENCY_KEY = 'l'   # Key to measure input-to-screen latency
+RECORD_KEY = 'r'    # Key to start/stop recording frames for offline tuning
 DETECTION_SCALE = 4 # For speed
+DEBUG_LOG_FILE = None # Write debug events to this file (rotated) instead of the terminal
+
+# Decision tuning (see EvaluatePolicy.py for tuning these offline)
+LEFT_LANE_CUTOFF = 0.3    # Bean bags left of this fraction of the frame width go to the left lane
+MIDDLE_LANE_CUTOFF = 0.7  # Bean bags left of this fraction (and right of the left cutoff) go to the middle lane
+FISH_FIRST = True         # Check for fish before pots and anvils
+COINS_PER_CATCH = None    # Coins earned per caught bean bag on the end screen, used to compare games; None until measured
+CARRY_LIMIT = 5           # Bags the penguin can hold; one more knocks it over
+DEPOSIT_AT = 4            # Deposit once this many bags have been counted
+DEPOSIT_INTERVAL = 1.0    # While bags keep coming, deposit at least this often in case catches went uncounted
+
+# Horizontal positions of the three lanes, as fractions of the game region width
+LANE_POSITIONS = {'left': 0.25, 'middle': 0.5, 'right': 0.75}
 
 # Color detection thresholds (BGR format for OpenCV)
 # These may need adjustment based on the game's colors on your screen
@@ -35,11 +62,66 @@ ONEUP_COLOR_UPPER = np.array([150, 105, 45])
 EARNINGS_SCREEN_LOWER = np.array([195, 120, 50]) # Earnings screen (For resetting)
 EARNINGS_SCREEN_UPPER = np.array([205, 130, 60])
 
+# Bit of each colour range in the combined match image (see build_color_tables)
+BEAN_BAG_BIT, FISH_BIT, ANVIL_BIT, POT_BIT, ONEUP_BIT, EARNINGS_BIT = 1, 2, 4, 8, 16, 32
+
+# Detector scheduling. Hazards are checked every frame; the rest whenever the budget allows, and at least at these rates (Hz)
+DETECTOR_BUDGET = 0.004   # Seconds per frame for detection
+BEAN_BAG_MIN_RATE = 30
+ONEUP_MIN_RATE = 10
+EARNINGS_MIN_RATE = 2
+
+# Button positions used to restart the game, as fractions of the game region
+RESTART_BUTTONS = {
+    'exit': (573/802, 200/502),
+    'coffee_bags': (825/1215, 511/763),
+    'confirm_play': (525/1215, 356/763),
+    'start_game': (1006/1215, 580/763),
+}
+
 # Global variables
 running = False
 paused = False
 debug_mode = False
 exit_program = False
+latency_calibration_requested = False
+recorder = FrameRecorder('BeanCounter')
+event_log = EventLog('BeanCounter')
+INPUT_LATENCY = 0.0      # Measured input-to-screen latency in seconds (0 until calibrated)
+last_bag_position = None # (center_x, center_y, detected_at, velocity_x) of the tracked bean bag, for lead compensation
+bag_detected_at = None   # When the current bean bag result was detected; the scheduler may repeat it on later frames
+bag_detector_run = None  # The scheduler's ran_at for that result, to tell a fresh result from a repeat
+COLOR_TABLES = None      # Per-channel lookup tables built from the colour ranges by build_color_tables
+detector_scheduler = None # Built by build_detector_scheduler
+catches = 0              # Bean bags caught this game
+lost_bags = 0            # Of those, bags knocked off by hazards before they were deposited
+chasing_bag = False      # Whether the last action was moving under a bean bag
+carried_bags = 0         # Bags counted as caught since the last deposit
+bags_since_deposit = False # Whether any bag was in view since the last deposit, so some may be carried uncounted
+last_deposit_time = 0    # When bags were last deposited
+hazard_lanes = {}        # Lane of each kind of hazard in view on the previous frame
+cursor_lane = None       # Lane the cursor was last moved to, None if something else moved it
+on_game_end = None       # Set by the unified runtime to take over restarting
+outcome_log = OutcomeLog()  # Finished games, for reports (see Common/Outcomes.py)
+game_started_at = None   # When this game started
+detections = 0           # Objects seen this game, summed over frames
+actions = 0              # Input events sent this game
+errors = 0               # Errors caught by the game loop this game
+
+# Settings stored in this host's tuning profile (see Common/Profiles.py)
+PROFILE_SETTINGS = [
+    'GAME_REGION', 'DETECTION_SCALE',
+    'BEAN_BAG_COLOR_LOWER', 'BEAN_BAG_COLOR_UPPER', 'FISH_COLOR_LOWER', 'FISH_COLOR_UPPER',
+    'ANVIL_COLOR_LOWER', 'ANVIL_COLOR_UPPER', 'POT_COLOR_LOWER', 'POT_COLOR_UPPER',
+    'ONEUP_COLOR_LOWER', 'ONEUP_COLOR_UPPER', 'EARNINGS_SCREEN_LOWER', 'EARNINGS_SCREEN_UPPER',
+    'LEFT_LANE_CUTOFF', 'MIDDLE_LANE_CUTOFF', 'FISH_FIRST', 'INPUT_LATENCY', 'RESTART_BUTTONS',
+    'COINS_PER_CATCH', 'DEPOSIT_AT', 'DEPOSIT_INTERVAL', 'DETECTOR_BUDGET', 'BEAN_BAG_MIN_RATE', 'ONEUP_MIN_RATE', 'EARNINGS_MIN_RATE',
+]
+
+# Settings measured rather than tuned. Outcomes are grouped by a hash of the
+# other settings, so recalibrating doesn't look like a new profile (see game_outcome)
+CALIBRATION_SETTINGS = ['GAME_REGION', 'INPUT_LATENCY', 'RESTART_BUTTONS', 'COINS_PER_CATCH']
+TUNING_SETTINGS = [name for name in PROFILE_SETTINGS if name not in CALIBRATION_SETTINGS]
 
 def cross_platform_key_listener():
     """Platform-independent key listener implementation"""
@@ -52,6 +134,8 @@ def cross_platform_key_listener():
         keyboard.on_press_key(PAUSE_KEY, lambda _: toggle_pause())
         keyboard.on_press_key(DEBUG_KEY, lambda _: toggle_debug())
         keyboard.on_press_key(QUIT_KEY, lambda _: trigger_exit())
+        keyboard.on_press_key(LATENCY_KEY, lambda _: request_latency_calibration())
+        keyboard.on_press_key(RECORD_KEY, lambda _: recorder.toggle())
         
         print(f"Using keyboard library for key detection")
         
@@ -75,6 +159,10 @@ def cross_platform_key_listener():
                             trigger_exit()
                         elif key.char.lower() == DEBUG_KEY:
                             toggle_debug()
+                        elif key.char.lower() == LATENCY_KEY:
+                            request_latency_calibration()
+                        elif key.char.lower() == RECORD_KEY:
+                            recorder.toggle()
                     # Handle function keys
                     elif hasattr(key, 'name'):
                         if key.name == START_KEY:
@@ -128,28 +216,113 @@ def calibrate_game_region():
     print(f"Game region set to: {region}")
     return region
 
+def build_color_tables():
+    """
+    Precompute lookup tables that test every colour range at once. Bit i of a table entry
+    is set if that channel value lies inside range i (bean bag, fish, anvil, pot, oneup, earnings).
+    """
+    global COLOR_TABLES
+    ranges = [
+        (BEAN_BAG_COLOR_LOWER, BEAN_BAG_COLOR_UPPER),
+        (FISH_COLOR_LOWER, FISH_COLOR_UPPER),
+        (ANVIL_COLOR_LOWER, ANVIL_COLOR_UPPER),
+        (POT_COLOR_LOWER, POT_COLOR_UPPER),
+        (ONEUP_COLOR_LOWER, ONEUP_COLOR_UPPER),
+        (EARNINGS_SCREEN_LOWER, EARNINGS_SCREEN_UPPER),
+    ]
+    values = np.arange(256)
+    tables = np.zeros((3, 256), dtype=np.uint8)
+    for bit, (lower, upper) in enumerate(ranges):
+        for channel in range(3):
+            tables[channel][(values >= lower[channel]) & (values <= upper[channel])] |= 1 << bit
+    COLOR_TABLES = tables
+
+build_color_tables()
+
+def match_colors(frame):
+    """Test every pixel against all colour ranges at once. Bit i of the result is set for range i."""
+    # Look every pixel up once per channel; a bit survives only if all three channels are in its range
+    blue, green, red = cv2.split(frame)
+    matches = cv2.bitwise_and(cv2.LUT(blue, COLOR_TABLES[0]), cv2.LUT(green, COLOR_TABLES[1]))
+    return cv2.bitwise_and(matches, cv2.LUT(red, COLOR_TABLES[2]))
+
+def find_color(matches, bit):
+    """Find the objects of one colour range in a match image."""
+    return find_objects(cv2.bitwise_and(matches, bit))
+
+def detect_hazards(matches):
+    """Find fish, anvils and flower pots."""
+    return find_color(matches, FISH_BIT), find_color(matches, ANVIL_BIT), find_color(matches, POT_BIT)
+
+def build_detector_scheduler():
+    """Set up which detectors run on which frames."""
+    global detector_scheduler
+    scheduler = DetectorScheduler(DETECTOR_BUDGET)
+    scheduler.add('hazards', detect_hazards, critical=True, initial=([], [], []))
+    scheduler.add('bean_bags', lambda matches: find_color(matches, BEAN_BAG_BIT), priority=2, min_rate=BEAN_BAG_MIN_RATE, initial=[])
+    scheduler.add('oneups', lambda matches: find_color(matches, ONEUP_BIT), priority=1, min_rate=ONEUP_MIN_RATE, initial=[])
+    scheduler.add('earnings', lambda matches: find_color(matches, EARNINGS_BIT), priority=0, min_rate=EARNINGS_MIN_RATE, initial=[])
+    detector_scheduler = scheduler
+
+build_detector_scheduler()
+
+def apply_profile(profile):
+    """
+    Apply a tuning profile, rebuilding the colour tables and scheduler only if their settings
+    changed. Raises ValueError and keeps the previous settings if the profile is invalid.
+    """
+    previous = {name: globals()[name] for name in PROFILE_SETTINGS}
+    changed = apply_settings(globals(), PROFILE_SETTINGS, profile)
+    try:
+        if DETECTION_SCALE < 1:
+            raise ValueError(f"DETECTION_SCALE must be at least 1, got {DETECTION_SCALE}")
+        if COINS_PER_CATCH is not None and not COINS_PER_CATCH > 0:
+            raise ValueError(f"COINS_PER_CATCH must be positive, got {COINS_PER_CATCH}")
+        if any(name.endswith(('_LOWER', '_UPPER')) for name in changed):
+            build_color_tables()
+        if any(name.endswith(('_RATE', '_BUDGET')) for name in changed):
+            build_detector_scheduler()
+        if GAME_REGION is not None:
+            capture_monitor()
+    except Exception as e:
+        globals().update(previous)
+        build_color_tables()
+        build_detector_scheduler()
+        raise ValueError(f"{type(e).__name__}: {e}") from e
+    return changed
+
+def locate_objects(frame):
+    """Find bean bags, fish, anvils, flower pots, oneups and the earnings screen without acting on them."""
+    matches = match_colors(frame)
+    fishes, anvils, pots = detect_hazards(matches)
+    bean_bags = find_color(matches, BEAN_BAG_BIT)
+    oneups = find_color(matches, ONEUP_BIT)
+    earnings = find_color(matches, EARNINGS_BIT)
+    
+    return bean_bags, fishes, anvils, pots, oneups, earnings
+
 def detect_objects(frame):
     """Detect bean bags, fish, anvils, and flower pots in the current frame."""
-    # Create masks for each object type
-    bean_bag_mask = cv2.inRange(frame, BEAN_BAG_COLOR_LOWER, BEAN_BAG_COLOR_UPPER)
-    fish_mask = cv2.inRange(frame, FISH_COLOR_LOWER, FISH_COLOR_UPPER)
-    anvil_mask = cv2.inRange(frame, ANVIL_COLOR_LOWER, ANVIL_COLOR_UPPER)
-    pot_mask = cv2.inRange(frame, POT_COLOR_LOWER, POT_COLOR_UPPER)
-    oneup_mask = cv2.inRange(frame, ONEUP_COLOR_LOWER, ONEUP_COLOR_UPPER)
-    earnings_mask = cv2.inRange(frame, EARNINGS_SCREEN_LOWER, EARNINGS_SCREEN_UPPER)
-    
-    # Find contours for each object type
-    bean_bags = find_objects(bean_bag_mask)
-    fishes = find_objects(fish_mask)
-    anvils = find_objects(anvil_mask)
-    pots = find_objects(pot_mask)
-    oneups = find_objects(oneup_mask)
-    earnings_mask = find_objects(earnings_mask)
-
-    if len(earnings_mask) > 0:
-        if debug_mode: print("Restarting game")
-        restart_game_sequence()
-        time.sleep(0.1)
+    global bag_detected_at, bag_detector_run
+    
+    # Hazards are found on every frame; the other detectors may return an earlier frame's result
+    now = time.time()
+    results = detector_scheduler.run(match_colors(frame))
+    fishes, anvils, pots = results['hazards']
+    bean_bags, oneups, earnings = results['bean_bags'], results['oneups'], results['earnings']
+    if detector_scheduler.ran_at('bean_bags') != bag_detector_run:
+        bag_detector_run = detector_scheduler.ran_at('bean_bags')
+        bag_detected_at = now
+
+    if len(earnings) > 0:
+        if on_game_end is not None:
+            on_game_end()
+        else:
+            if debug_mode: event_log.log("Restarting game")
+            restart_game_sequence()
+            time.sleep(0.1)
+        # Don't act on the finished game's results in the next one
+        detector_scheduler.reset()
     
     # Draw contours if debug mode is on
     if debug_mode:
@@ -198,6 +371,43 @@ def find_objects(mask):
     
     return [contour]
 
+def predict_bag_x(center_x, center_y):
+    """
+    Predict where the tracked bean bag will be once a move made now shows up on screen.
+    Bags are thrown in an arc, so the horizontal velocity between the last two detections is
+    extrapolated by the measured input latency, plus the age of the detection when the
+    scheduler is repeating an earlier frame's result.
+    """
+    global last_bag_position
+    
+    now = time.time()
+    detected_at = bag_detected_at if bag_detected_at is not None else now
+    
+    # Only a fresh detection moves the tracked position; a repeated one carries no new information
+    if last_bag_position is None or detected_at != last_bag_position[2]:
+        velocity_x = 0.0
+        if last_bag_position is not None:
+            last_x, last_y, last_time, _ = last_bag_position
+            elapsed = detected_at - last_time
+            # Only trust the velocity if this looks like the same bag a moment later
+            if 0 < elapsed < 0.2 and center_y >= last_y:
+                velocity_x = (center_x - last_x) / elapsed
+        last_bag_position = (center_x, center_y, detected_at, velocity_x)
+    
+    if INPUT_LATENCY <= 0:
+        return center_x
+    return center_x + last_bag_position[3] * (now - detected_at + INPUT_LATENCY)
+
+def frame_lane(contour, width):
+    """Lane an object in the frame is falling into."""
+    x, y, w, h = cv2.boundingRect(contour)
+    center_x = x + w // 2
+    if center_x < width * LEFT_LANE_CUTOFF:
+        return 'left'
+    if center_x < width * MIDDLE_LANE_CUTOFF:
+        return 'middle'
+    return 'right'
+
 def determine_action(bean_bags, fishes, anvils, pots, oneups, width): # ['left'|'middle'|'right', hazard:True/False]
     """Determine the best action based on detected objects."""
     
@@ -205,12 +415,12 @@ def determine_action(bean_bags, fishes, anvils, pots, oneups, width): # ['left'|
     # Otherwise, if there is a bean bag on the left of the screen, go to the left. If there is a bean bag in the middle, go to the middle. If there is a bean bag to the right of the screen, go to the right.
     
     # Define the three lane regions
-    left_region_righthand = width * 0.3
-    middle_region_righthand = width * 0.7
+    left_region_righthand = width * LEFT_LANE_CUTOFF
+    middle_region_righthand = width * MIDDLE_LANE_CUTOFF
 
     # Check for fish (always go to the middle to catch fish)
-    if len(fishes) > 0:
-        if debug_mode: print('Detected Fish')
+    if len(fishes) > 0 and (FISH_FIRST or len(pots) + len(anvils) == 0):
+        if debug_mode: event_log.log('Detected Fish')
         
         if len(pots) > 0: # Pots have not been checked yet, so we don't know if it's safe
             return ('right', True)
@@ -218,11 +428,11 @@ def determine_action(bean_bags, fishes, anvils, pots, oneups, width): # ['left'|
             return ('middle', True)
 
     if len(pots) > 0:
-        if debug_mode: print('Detected Pot')
+        if debug_mode: event_log.log('Detected Pot')
         return ('left', True)
     
     if len(anvils) > 0:
-        if debug_mode: print('Detected Anvil')
+        if debug_mode: event_log.log('Detected Anvil')
         return ('left', True)
     
     # join oneups and bean bags
@@ -244,43 +454,62 @@ def determine_action(bean_bags, fishes, anvils, pots, oneups, width): # ['left'|
         if closest_bean_bag:
             x, y, w, h = closest_bean_bag
             center_x = (x + w // 2) # scale back up
+            center_x = predict_bag_x(center_x, y + h // 2)
         
             # Determine which lane the bean bag is in
             if center_x < left_region_righthand:
-                if debug_mode: print('Detected lefthand bean bag')
+                if debug_mode: event_log.log('Detected lefthand bean bag')
                 return ('left', False)
             elif center_x < middle_region_righthand:
-                if debug_mode: print('Detected middle bean bag')
+                if debug_mode: event_log.log('Detected middle bean bag')
                 return ('middle', False)
             else:
-                if debug_mode: print('Detected righthand bean bag')
+                if debug_mode: event_log.log('Detected righthand bean bag')
                 return ('right', False)
     
     # Default action if nothing is detected
-    if debug_mode: print('Nothing Detected')
+    if debug_mode: event_log.log('Nothing Detected')
     return ('left', False)
 
-def move_penguin(action, hazard, game_region):
-    """Move the penguin based on the determined action."""
-    # Calculate the three lane positions
-    left_x = game_region[0] + game_region[2] * 0.25
-    middle_x = game_region[0] + game_region[2] * 0.5
-    right_x = game_region[0] + game_region[2] * 0.75
-    y_position = game_region[1] + game_region[3] * 0.65  # Position the penguin near the bottom
+def move_penguin(action, hazard, game_region, incoming=True):
+    """
+    Move the penguin based on the determined action. Bags are deposited (in the left lane) when
+    the counted stack is nearly full or the penguin is going left anyway, and, since a catch made
+    while another bag is in view isn't counted, in every gap after bags were seen and at least
+    every DEPOSIT_INTERVAL. Never as a detour while dodging. The cursor is only moved when the
+    lane changes.
+    """
+    global carried_bags, bags_since_deposit, last_deposit_time, actions
     
-    def deposit_bags():
-        pyautogui.moveTo(left_x, y_position)
-        pyautogui.click(clicks=4)
+    y_position = game_region[1] + game_region[3] * 0.65  # Position the penguin near the bottom
     
-    # Move to the appropriate lane
-    if action == 'left':
-        deposit_bags()
-    elif action == 'middle':
-        if not hazard: deposit_bags()
-        pyautogui.moveTo(middle_x, y_position)
-    elif action == 'right':
-        if not hazard: deposit_bags()
-        pyautogui.moveTo(right_x, y_position)
+    def move_to(lane):
+        global cursor_lane, actions
+        if lane != cursor_lane:
+            pyautogui.moveTo(game_region[0] + game_region[2] * LANE_POSITIONS[lane], y_position)
+            cursor_lane = lane
+            actions += 1
+    
+    now = time.time()
+    if hazard:
+        deposit = action == 'left' and carried_bags > 0
+    else:
+        deposit = (carried_bags >= DEPOSIT_AT
+                   or (carried_bags > 0 and action == 'left')
+                   or (bags_since_deposit and (not incoming or now - last_deposit_time > DEPOSIT_INTERVAL)))
+    
+    if deposit:
+        move_to('left')
+        # One click drops one bag. The count can be low, and spare clicks cost nothing, so drop a full stack
+        pyautogui.click(clicks=CARRY_LIMIT)
+        actions += CARRY_LIMIT
+        carried_bags = 0
+        bags_since_deposit = False
+        last_deposit_time = now
+    
+    # With nothing to catch or dodge, stay put
+    if hazard or incoming:
+        move_to(action)
 
 def toggle_running():
     """Toggle the running state of the bot."""
@@ -294,23 +523,146 @@ def toggle_pause():
     paused = not paused
     print(f"Bot {'paused' if paused else 'resumed'}")
 
+def request_latency_calibration():
+    """Ask the main loop to measure input latency before the next frame."""
+    global latency_calibration_requested
+    latency_calibration_requested = True
+    print("Latency calibration requested")
+
 def toggle_debug():
     """Toggle debug mode to show object detection visualization."""
     global debug_mode
     debug_mode = not debug_mode
     print(f"Debug mode {'enabled' if debug_mode else 'disabled'}")
 
-def restart_game_sequence():
+def capture_monitor():
+    """Area of the screen the bot watches."""
+    return {
+        "left": GAME_REGION[0] + int(GAME_REGION[2] * 0.2),
+        "top": GAME_REGION[1] + int(GAME_REGION[3] * 0.4),
+        "width": int(GAME_REGION[2] * 0.66),
+        "height": int(GAME_REGION[3] * 0.45)
+    }
+
+def calibrate_input_latency(sct, monitor):
+    """Move the penguin between the outer lanes and measure how long each move takes to show up."""
+    global INPUT_LATENCY, cursor_lane
+    
+    left_x = GAME_REGION[0] + GAME_REGION[2] * 0.25
+    right_x = GAME_REGION[0] + GAME_REGION[2] * 0.75
+    y_position = GAME_REGION[1] + GAME_REGION[3] * 0.65
+    
+    def grab():
+        return cv2.cvtColor(sct.grab(monitor), cv2.COLOR_BGRA2BGR)
+    
+    def probe(index):
+        pyautogui.moveTo(right_x if index % 2 == 0 else left_x, y_position)
+    
+    print("Measuring input latency, keep the game window visible...")
+    pyautogui.moveTo(left_x, y_position)
+    time.sleep(0.5)
+    summary = summarize_latency(measure_input_latency(grab, probe, should_abort=lambda: exit_program))
+    print(f"Input latency: {format_latency(summary)}")
+    
+    if summary is not None:
+        INPUT_LATENCY = summary['median']
+    cursor_lane = None  # The probes moved the cursor
+
+def play_frame(frame):
+    """Detect, decide and move for one captured frame."""
+    global catches, lost_bags, chasing_bag, carried_bags, bags_since_deposit, hazard_lanes, detections, game_started_at
+    
+    if game_started_at is None:
+        game_started_at = time.time()
+    
+    # Detect objects
+    bean_bags, fishes, anvils, pots, oneups = detect_objects(frame)
+    detections += len(bean_bags) + len(fishes) + len(anvils) + len(pots) + len(oneups)
+    
+    # A bag we were moving under that is now gone has been caught
+    if chasing_bag and len(bean_bags) == 0:
+        catches += 1
+        carried_bags += 1
+    if len(bean_bags) > 0:
+        bags_since_deposit = True
+    
+    # A hazard that landed in the penguin's lane knocked the stack off
+    width = frame.shape[1]
+    lanes = {kind: frame_lane(objects[0], width) for kind, objects in [('fish', fishes), ('anvil', anvils), ('pot', pots)] if len(objects) > 0}
+    if any(kind not in lanes and lane == cursor_lane for kind, lane in hazard_lanes.items()):
+        if debug_mode: event_log.log("Hit by a hazard, stack lost")
+        lost_bags += carried_bags
+        carried_bags = 0
+        bags_since_deposit = False
+    hazard_lanes = lanes
+    
+    # Determine action
+    action, hazard = determine_action(bean_bags, fishes, anvils, pots, oneups, frame.shape[1])
+    chasing_bag = len(bean_bags) > 0 and not hazard
+    
+    # Move the penguin
+    move_penguin(action, hazard, GAME_REGION, len(bean_bags) + len(oneups) > 0)
+
+def start_game_stats():
+    """Reset the per-game counters."""
+    global catches, lost_bags, chasing_bag, carried_bags, bags_since_deposit, last_deposit_time, hazard_lanes, cursor_lane
+    global game_started_at, detections, actions, errors
+    catches = 0
+    lost_bags = 0
+    chasing_bag = False
+    carried_bags = 0
+    bags_since_deposit = False
+    last_deposit_time = time.time()
+    hazard_lanes = {}
+    cursor_lane = None
+    game_started_at = time.time()
+    detections = actions = errors = 0
+    detector_scheduler.reset()
+
+def coins_this_game():
+    """Estimated coins earned this game, or None if COINS_PER_CATCH hasn't been measured. Bags lost to hazards earn nothing."""
+    if COINS_PER_CATCH is None:
+        return None
+    return (catches - lost_bags) * COINS_PER_CATCH
+
+def game_summary():
+    """What coins_this_game is counted from, for measuring COINS_PER_CATCH against the end screen."""
+    return f"{catches - lost_bags} catches kept ({lost_bags} lost to hazards)"
+
+def game_outcome():
+    """This game's row for the outcome database. The score isn't read from the earnings screen."""
+    return {
+        'game': GAME_NAME,
+        'profile': profile_id(settings_profile(globals(), TUNING_SETTINGS)),
+        'started': game_started_at if game_started_at is not None else time.time(),
+        'ended': time.time(),
+        'detections': detections,
+        'actions': actions,
+        'errors': errors,
+        'coins': coins_this_game(),
+    }
+
+def release_inputs():
+    """Nothing is held down in Bean Counters."""
+    pass
+
+def exit_game():
+    """Leave the earnings screen, back into the Coffee Shop."""
     game_region = GAME_REGION
-    ExitButtonPos = (573/802, 200/502)
-    CafeCoffeeBagsPos = (825/1215, 511/763)
-    ConfirmPlayPos = (525/1215, 356/763)
-    StartGamePos = (1006/1215, 580/763)
+    ExitButtonPos = RESTART_BUTTONS['exit']
     
     #Exit Game
     pyautogui.moveTo(game_region[0] + game_region[2] * ExitButtonPos[0], game_region[1] + game_region[3] * ExitButtonPos[1])
     pyautogui.click()
     time.sleep(1)
+
+def enter_game():
+    """Start a new game from inside the Coffee Shop."""
+    game_region = GAME_REGION
+    CafeCoffeeBagsPos = RESTART_BUTTONS['coffee_bags']
+    ConfirmPlayPos = RESTART_BUTTONS['confirm_play']
+    StartGamePos = RESTART_BUTTONS['start_game']
+    
     # Click on Coffee Bags
     pyautogui.moveTo(game_region[0] + game_region[2] * CafeCoffeeBagsPos[0], game_region[1] + game_region[3] * CafeCoffeeBagsPos[1])
     pyautogui.click()
@@ -322,10 +674,17 @@ def restart_game_sequence():
     # Start Game
     pyautogui.moveTo(game_region[0] + game_region[2] * StartGamePos[0], game_region[1] + game_region[3] * StartGamePos[1])
     pyautogui.click()
-    
+
+def restart_game_sequence():
+    outcome = game_outcome()
+    exit_game()
+    enter_game()
+    outcome['restart_seconds'] = time.time() - outcome['ended']
+    outcome_log.record(outcome)
+    start_game_stats()
 
 def main():
-    global running, paused, GAME_REGION, exit_program
+    global running, paused, GAME_REGION, exit_program, latency_calibration_requested, errors
     
     # Set pyautogui settings for faster movement
     pyautogui.PAUSE = 0.01
@@ -337,43 +696,72 @@ def main():
     print(f"Press {START_KEY} to start/stop")
     print(f"Press {PAUSE_KEY} to pause/resume")
     print(f"Press {DEBUG_KEY} to toggle debug mode")
+    print(f"Press {LATENCY_KEY} to measure input latency")
+    print(f"Press {RECORD_KEY} to start/stop recording frames")
     print(f"Press {QUIT_KEY} to quit")
     
+    # Debug output is written from a background thread so it can't stall the game loop
+    event_log.start(DEBUG_LOG_FILE)
+    outcome_log.start()
+    
     # Start key listener in a separate thread
     listener_thread = threading.Thread(target=cross_platform_key_listener)
     listener_thread.daemon = True
     listener_thread.start()
     
-    # Calibrate game region
-    GAME_REGION = calibrate_game_region()
-    sct = mss.mss()
+    # Load this host's profile, calibrating the game region only if it has none
+    profile_file = profile_path('BeanCounter')
+    try:
+        profile = load_profile(profile_file)
+    except (ValueError, OSError) as e:
+        print(f"Could not read profile {profile_file}: {e}")
+        profile = None
+    if profile is not None:
+        try:
+            apply_profile(profile)
+            print(f"Loaded profile {profile_file}")
+        except ValueError as e:
+            print(f"Could not apply profile {profile_file}: {e}")
+    if GAME_REGION is None:
+        GAME_REGION = calibrate_game_region()
+        save_profile(profile_file, settings_profile(globals(), PROFILE_SETTINGS))
+        print(f"Saved profile {profile_file}")
+    profile_watcher = ProfileWatcher(profile_file)
+    
+    sct = create_capture()
+    monitor = capture_monitor()
     
     try:
         while not exit_program:
+            # Pick up profile edits between frames
+            profile = profile_watcher.take()
+            if profile is not None:
+                try:
+                    changed = apply_profile(profile)
+                    monitor = capture_monitor()
+                    print(f"Reloaded profile, changed: {', '.join(changed) if changed else 'nothing'}")
+                except ValueError as e:
+                    print(f"Ignoring invalid profile, keeping the previous settings: {e}")
+            
+            if latency_calibration_requested:
+                latency_calibration_requested = False
+                calibrate_input_latency(sct, monitor)
+                save_profile(profile_file, settings_profile(globals(), PROFILE_SETTINGS))
+                profile_watcher.saved()
+            
             if running and not paused:
                 try:
                     # Capture the game screen
-                    monitor = {
-                        "left": GAME_REGION[0] + int(GAME_REGION[2] * 0.2),
-                        "top": GAME_REGION[1] + int(GAME_REGION[3] * 0.4),
-                        "width": int(GAME_REGION[2] * 0.66),
-                        "height": int(GAME_REGION[3] * 0.45)
-                    }
-                    screenshot = np.array(sct.grab(monitor))
+                    screenshot = sct.grab(monitor)
                     # Convert from RGB to BGR (for OpenCV)
                     frame = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR)
                     frame = cv2.resize(frame, (frame.shape[1]//DETECTION_SCALE, frame.shape[0]//DETECTION_SCALE))
+                    recorder.add(frame)
                     
-                    # Detect objects
-                    bean_bags, fishes, anvils, pots, oneups = detect_objects(frame)
-                    
-                    # Determine action
-                    action, hazard = determine_action(bean_bags, fishes, anvils, pots, oneups, frame.shape[1])
-                    
-                    # Move the penguin
-                    move_penguin(action, hazard, GAME_REGION)
+                    play_frame(frame)
                 except Exception as e:
-                    print(f"Error during gameplay: {e}")
+                    event_log.log("Error during gameplay: {}", e)
+                    errors += 1
                     time.sleep(1)  # Pause briefly on error
             
             # Small delay to reduce CPU usage
@@ -384,6 +772,9 @@ def main():
     finally:
         # Clean up
         exit_program = True
+        event_log.stop()
+        outcome_log.stop()
+        profile_watcher.stop()
         if debug_mode:
             cv2.destroyAllWindows()
 
@@ -0,0 +1,224 @@
+"""
+Offline tuning of the Bean Counter decision constants.
+
+Detections are computed once for a recorded session (press r while the bot plays),
+then determine_action is replayed as a vectorized function over every parameter set
+in a grid and the sets are ranked by a proxy score. Bags are led by the input latency
+like predict_bag_x does, using this host's measured INPUT_LATENCY unless --latency is given.
+
+Usage: python EvaluatePolicy.py ../recordings/BeanCounter-<date>.npz [--steps 40] [--workers 4] [--top 10] [--latency 0.1]
+"""
+import argparse
+import time
+import numpy as np
+from multiprocessing import Pool
+
+import BeanCounter as game  # Also puts the repository root on the path for Common
+from Common.Recording import load_recording
+from Common.Profiles import profile_path, load_profile
+
+# Lane centres in frame coordinates. move_penguin puts the penguin at LANE_POSITIONS of the
+# game width, and the captured frame spans 0.2 to 0.86 of it.
+PENGUIN_LANE_X = (np.array(list(game.LANE_POSITIONS.values())) - 0.2) / 0.66
+
+HAZARD_PENALTY = 5  # A lost life costs about this many caught bags
+CHUNK_SIZE = 256    # Parameter sets evaluated per worker task
+
+LEFT, MIDDLE, RIGHT = 0, 1, 2
+
+def object_center(objects):
+    """Centre (x, y) of the first detected object, or NaNs if there is none."""
+    if len(objects) == 0:
+        return np.nan, np.nan
+    x, y = objects[0].reshape(-1, 2).mean(axis=0)
+    return x, y
+
+def lead_bag_x(bag_x, bag_y, times, latency):
+    """
+    predict_bag_x over a session: each bag's x moved on by its velocity since the previous frame
+    with a bag, times the input latency. Detection runs on every recorded frame, so no result is
+    a repeat.
+    """
+    if latency <= 0:
+        return bag_x
+    present = ~np.isnan(bag_x)
+    last_seen = np.maximum.accumulate(np.where(present, np.arange(len(bag_x)), -1))
+    previous = np.insert(last_seen[:-1], 0, -1)
+    has_previous = present & (previous >= 0)
+    before = np.where(has_previous, previous, 0)
+
+    elapsed = times - times[before]
+    # Only trust the velocity if this looks like the same bag a moment later
+    tracked = has_previous & (elapsed > 0) & (elapsed < 0.2) & (bag_y >= bag_y[before])
+    velocity = np.zeros(len(bag_x))
+    velocity[tracked] = (bag_x[tracked] - bag_x[before][tracked]) / elapsed[tracked]
+    return bag_x + velocity * latency
+
+def extract_features(frames, times, latency=0.0):
+    """Run detection once per frame and return the per-frame arrays the policy needs."""
+    count = len(frames)
+    features = {
+        'bag_x': np.full(count, np.nan), 'bag_y': np.full(count, np.nan),
+        'fish_x': np.full(count, np.nan), 'pot_x': np.full(count, np.nan), 'anvil_x': np.full(count, np.nan),
+    }
+
+    for index, frame in enumerate(frames):
+        bean_bags, fishes, anvils, pots, oneups, earnings = game.locate_objects(frame)
+        features['bag_x'][index], features['bag_y'][index] = object_center(bean_bags)
+        features['fish_x'][index] = object_center(fishes)[0]
+        features['pot_x'][index] = object_center(pots)[0]
+        features['anvil_x'][index] = object_center(anvils)[0]
+
+    # Where the bot aims; the raw x still decides where each bag lands
+    features['lead_x'] = lead_bag_x(features['bag_x'], features['bag_y'], times, latency)
+    features['width'] = frames.shape[2]
+    return features
+
+def landing_frames(x, y=None):
+    """
+    Indices of frames where a tracked object is last seen before it lands: it is visible
+    on this frame and gone (or replaced by a new, higher object) on the next one.
+    """
+    present = ~np.isnan(x)
+    ends = present & ~np.append(present[1:], False)
+    if y is not None:
+        # A new bag appearing higher up while the previous one is still visible
+        restarted = np.append(y[1:] < y[:-1] - 5, False) & present & np.append(present[1:], False)
+        ends |= restarted
+    return np.flatnonzero(ends)
+
+def nearest_lane(x, width):
+    """Lane the penguin would have to stand in to be under x."""
+    return np.argmin(np.abs(x[:, None] / width - PENGUIN_LANE_X[None, :]), axis=1)
+
+def prepare_events(features):
+    """Reduce the session to the frames the score depends on: bag and hazard landings."""
+    width = features['width']
+    bag_events = landing_frames(features['bag_x'], features['bag_y'])
+
+    hazard_events = []
+    hazard_lanes = []
+    for key in ['fish_x', 'pot_x', 'anvil_x']:
+        events = landing_frames(features[key])
+        hazard_events.append(events)
+        hazard_lanes.append(nearest_lane(features[key][events], width))
+    hazard_events = np.concatenate(hazard_events)
+    hazard_lanes = np.concatenate(hazard_lanes)
+
+    def at(indices):
+        return {
+            'bag_x': features['lead_x'][indices],
+            'fish': ~np.isnan(features['fish_x'][indices]),
+            'pot': ~np.isnan(features['pot_x'][indices]),
+            'anvil': ~np.isnan(features['anvil_x'][indices]),
+        }
+
+    return {
+        'width': width,
+        'bags': at(bag_events),
+        'bag_lanes': nearest_lane(features['bag_x'][bag_events], width),
+        'hazards': at(hazard_events),
+        'hazard_lanes': hazard_lanes,
+    }
+
+def policy_lanes(frames, width, left_cutoff, middle_cutoff, fish_first):
+    """
+    determine_action as a pure function: frames holds per-frame arrays of length N and the
+    parameters are arrays of length P. Returns the chosen lane for every (parameter set, frame).
+    """
+    bag_x = frames['bag_x'][None, :]
+    fish = frames['fish'][None, :]
+    pot = frames['pot'][None, :]
+    danger = (frames['pot'] | frames['anvil'])[None, :]
+    fish_first = fish_first[:, None]
+
+    bag_lane = np.where(bag_x < left_cutoff[:, None] * width, LEFT,
+                        np.where(bag_x < middle_cutoff[:, None] * width, MIDDLE, RIGHT))
+    bag_lane = np.where(np.isnan(bag_x), LEFT, bag_lane)
+    fish_lane = np.where(pot, RIGHT, MIDDLE)
+
+    takes_fish = fish & (fish_first | ~danger)
+    return np.where(takes_fish, fish_lane, np.where(danger, LEFT, bag_lane))
+
+# Session events shared with worker processes
+_events = None
+
+def _init_worker(events):
+    global _events
+    _events = events
+
+def score_chunk(params):
+    """Score a chunk of parameter sets. params is a (P, 3) array of left cutoff, middle cutoff, fish first."""
+    left_cutoff, middle_cutoff, fish_first = params[:, 0], params[:, 1], params[:, 2].astype(bool)
+    width = _events['width']
+
+    bag_lanes = policy_lanes(_events['bags'], width, left_cutoff, middle_cutoff, fish_first)
+    catches = np.sum(bag_lanes == _events['bag_lanes'][None, :], axis=1)
+
+    hazard_lanes = policy_lanes(_events['hazards'], width, left_cutoff, middle_cutoff, fish_first)
+    missed_hazards = np.sum(hazard_lanes == _events['hazard_lanes'][None, :], axis=1)
+
+    score = catches - HAZARD_PENALTY * missed_hazards
+    return np.column_stack([params, catches, missed_hazards, score])
+
+def parameter_grid(steps):
+    """Every combination of lane cutoffs and hazard priority, skipping overlapping cutoffs."""
+    left, middle, fish_first = np.meshgrid(np.linspace(0.1, 0.5, steps), np.linspace(0.4, 0.9, steps), [1, 0], indexing='ij')
+    grid = np.column_stack([left.ravel(), middle.ravel(), fish_first.ravel()])
+    return grid[grid[:, 0] < grid[:, 1]]
+
+def evaluate(events, grid, workers):
+    chunks = [grid[start:start + CHUNK_SIZE] for start in range(0, len(grid), CHUNK_SIZE)]
+    if workers <= 1:
+        _init_worker(events)
+        results = [score_chunk(chunk) for chunk in chunks]
+    else:
+        with Pool(workers, initializer=_init_worker, initargs=(events,)) as pool:
+            results = pool.map(score_chunk, chunks)
+    return np.concatenate(results)
+
+def score_chunk_current(events):
+    """Score the constants currently set in BeanCounter.py."""
+    _init_worker(events)
+    return score_chunk(np.array([[game.LEFT_LANE_CUTOFF, game.MIDDLE_LANE_CUTOFF, float(game.FISH_FIRST)]]))[0]
+
+def profile_latency():
+    """This host's measured input latency from its Bean Counter profile, or 0 if it has none."""
+    try:
+        profile = load_profile(profile_path(game.GAME_NAME))
+    except (ValueError, OSError) as e:
+        print(f"Could not read the Bean Counter profile: {e}")
+        return 0.0
+    return float((profile or {}).get('INPUT_LATENCY', 0.0))
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid-search the Bean Counter decision constants over a recorded session")
+    parser.add_argument('recording', help="Path to a BeanCounter .npz recording")
+    parser.add_argument('--steps', type=int, default=40, help="Grid steps per lane cutoff")
+    parser.add_argument('--workers', type=int, default=4, help="Worker processes")
+    parser.add_argument('--top', type=int, default=10, help="Number of parameter sets to show")
+    parser.add_argument('--latency', type=float, help="Input latency in seconds to lead bags by (default: this host's profile)")
+    args = parser.parse_args()
+
+    latency = args.latency if args.latency is not None else profile_latency()
+    frames, times = load_recording(args.recording)
+    start = time.perf_counter()
+    events = prepare_events(extract_features(frames, times, latency))
+    print(f"Detection on {len(frames)} frames took {time.perf_counter() - start:.1f}s: "
+          f"{len(events['bag_lanes'])} bag landings, {len(events['hazard_lanes'])} hazard landings, "
+          f"bags led by {latency * 1000:.0f}ms")
+
+    grid = parameter_grid(args.steps)
+    start = time.perf_counter()
+    results = evaluate(events, grid, args.workers)
+    print(f"Evaluated {len(grid)} parameter sets in {time.perf_counter() - start:.2f}s")
+
+    current = score_chunk_current(events)
+    print(f"Current settings: catches {current[3]:.0f}, missed hazards {current[4]:.0f}, score {current[5]:.0f}")
+
+    print("left_cutoff middle_cutoff fish_first catches missed_hazards score")
+    for row in results[np.argsort(-results[:, 5], kind='stable')][:args.top]:
+        print(f"{row[0]:11.3f} {row[1]:13.3f} {bool(row[2])!s:>10} {row[3]:7.0f} {row[4]:14.0f} {row[5]:5.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Simulated Bean Counter games, comparing deposit strategies by input events and catches per minute.
+
+A small model of the game throws bean bags and hazards into the three lanes and renders each
+frame in the game's colours; Bean Counter's real play_frame plays it. pyautogui is replaced by
+the simulation: every call costs pyautogui.PAUSE of game time, during which the game keeps
+going with the cursor wherever it is, so inputs that aren't needed cost catches.
+
+The bot's deposit planner is compared with the previous strategy, which walked to the left lane
+and clicked 4 times on every frame that wasn't a hazard dodge, in three scenarios:
+    sparse       one bag in view at a time, hazards only where the bot's dodges avoid them
+    overlapping  bags thrown faster than they fall, so several are in view at once
+    hazard_hits  overlapping bags, and hazards that can land in any lane
+The counted column is what the bot credits coins for (catches less bags lost to hazards), to
+compare with the bags really delivered.
+
+Usage (from the repository root):
+    python -m Benchmarks.DepositBenchmark [--minutes 5] [--seed 0] [--scenario overlapping]
+"""
+import sys
+import types
+import argparse
+import numpy as np
+
+class _Inputs:
+    """Forwards pyautogui calls to the running simulation."""
+    simulation = None
+
+def _install_input_stub():
+    stub = types.ModuleType('pyautogui')
+    stub.moveTo = lambda x, y, *args, **kwargs: _Inputs.simulation.move_to(x)
+    stub.click = lambda *args, clicks=1, **kwargs: _Inputs.simulation.click(clicks)
+    for name in ['keyDown', 'keyUp', 'press']:
+        setattr(stub, name, lambda *args, **kwargs: None)
+    stub.position = lambda: (0, 0)
+    sys.modules['pyautogui'] = stub
+
+_install_input_stub()
+
+from BeanCounter import BeanCounter
+
+GAME_REGION = (0, 0, 802, 502)
+DETECTION_SCALE = 2
+FRAME_SECONDS = 0.02        # Capture, detection and the loop's sleep, per frame
+INPUT_SECONDS = 0.01        # pyautogui.PAUSE as set by the bot, paid after every call
+FALL_SECONDS = 0.8          # How long a thrown object is in view before it lands
+CARRY_LIMIT = 5             # Catching one more bag than this knocks the penguin over
+OBJECT_SIZE = 12            # Pixels at DETECTION_SCALE
+LANDING_HEIGHT = (0.65 - 0.4) / 0.45  # Penguin height as a fraction of the captured area
+
+# Where each kind of hazard can land; the bot dodges fish to the middle and the others to the left
+DODGEABLE_LANES = {'fish': ['left', 'right'], 'anvil': ['middle', 'right'], 'pot': ['middle', 'right']}
+ANY_LANE = {kind: ['left', 'middle', 'right'] for kind in DODGEABLE_LANES}
+
+# Seconds between thrown bags and between hazards, and where hazards land
+SCENARIOS = {
+    'sparse': {'bag_interval': (0.9, 1.6), 'hazard_interval': (3.0, 6.0), 'hazard_lanes': DODGEABLE_LANES},
+    'overlapping': {'bag_interval': (0.4, 0.8), 'hazard_interval': (3.0, 6.0), 'hazard_lanes': DODGEABLE_LANES},
+    'hazard_hits': {'bag_interval': (0.4, 0.8), 'hazard_interval': (1.5, 3.0), 'hazard_lanes': ANY_LANE},
+}
+
+def _midpoint(lower, upper):
+    return ((lower + upper) // 2).astype(np.uint8)
+
+COLORS = {
+    'bag': _midpoint(BeanCounter.BEAN_BAG_COLOR_LOWER, BeanCounter.BEAN_BAG_COLOR_UPPER),
+    'fish': _midpoint(BeanCounter.FISH_COLOR_LOWER, BeanCounter.FISH_COLOR_UPPER),
+    'anvil': _midpoint(BeanCounter.ANVIL_COLOR_LOWER, BeanCounter.ANVIL_COLOR_UPPER),
+    'pot': _midpoint(BeanCounter.POT_COLOR_LOWER, BeanCounter.POT_COLOR_UPPER),
+}
+
+def legacy_move_penguin(action, hazard, game_region, incoming=True):
+    """The strategy before deposit planning: deposit with 4 clicks unless dodging."""
+    left_x = game_region[0] + game_region[2] * 0.25
+    middle_x = game_region[0] + game_region[2] * 0.5
+    right_x = game_region[0] + game_region[2] * 0.75
+    y_position = game_region[1] + game_region[3] * 0.65
+
+    def deposit_bags():
+        BeanCounter.pyautogui.moveTo(left_x, y_position)
+        BeanCounter.pyautogui.click(clicks=4)
+
+    if action == 'left':
+        deposit_bags()
+    elif action == 'middle':
+        if not hazard: deposit_bags()
+        BeanCounter.pyautogui.moveTo(middle_x, y_position)
+    elif action == 'right':
+        if not hazard: deposit_bags()
+        BeanCounter.pyautogui.moveTo(right_x, y_position)
+
+STRATEGIES = {'legacy': legacy_move_penguin, 'planner': BeanCounter.move_penguin}
+
+class Simulation:
+    def __init__(self, seed, scenario):
+        self.rng = np.random.default_rng(seed)
+        self.bag_interval = scenario['bag_interval']
+        self.hazard_interval = scenario['hazard_interval']
+        self.hazard_lanes = scenario['hazard_lanes']
+        self.clock = 0.0
+        self.cursor = 0.5 * GAME_REGION[2]
+        self.carried = 0
+        self.objects = []  # (lands, thrown, kind, lane), in throwing order
+        self.next_bag = self.rng.uniform(*self.bag_interval)
+        self.next_hazard = self.rng.uniform(*self.hazard_interval)
+        self.counts = {'inputs': 0, 'caught': 0, 'missed': 0, 'delivered': 0, 'toppled': 0, 'hits': 0}
+
+        self.height = int(GAME_REGION[3] * 0.45) // DETECTION_SCALE
+        self.width = int(GAME_REGION[2] * 0.66) // DETECTION_SCALE
+        # Frame x of each lane, where move_penguin puts the penguin
+        self.lane_x = {lane: int((position - 0.2) / 0.66 * self.width) for lane, position in BeanCounter.LANE_POSITIONS.items()}
+
+    def penguin_lane(self):
+        position = self.cursor / GAME_REGION[2]
+        return min(BeanCounter.LANE_POSITIONS, key=lambda lane: abs(BeanCounter.LANE_POSITIONS[lane] - position))
+
+    def _throw(self, until):
+        while self.next_bag <= until:
+            lane = self.rng.choice(list(BeanCounter.LANE_POSITIONS))
+            self.objects.append((self.next_bag + FALL_SECONDS, self.next_bag, 'bag', lane))
+            self.next_bag += self.rng.uniform(*self.bag_interval)
+        while self.next_hazard <= until:
+            kind = self.rng.choice(list(self.hazard_lanes))
+            lane = self.rng.choice(self.hazard_lanes[kind])
+            self.objects.append((self.next_hazard + FALL_SECONDS, self.next_hazard, kind, lane))
+            self.next_hazard += self.rng.uniform(*self.hazard_interval)
+
+    def _land(self, kind, lane):
+        under = self.penguin_lane() == lane
+        if kind != 'bag':
+            if under:
+                self.counts['hits'] += 1
+                self.carried = 0
+        elif not under:
+            self.counts['missed'] += 1
+        elif self.carried == CARRY_LIMIT:
+            self.counts['toppled'] += 1
+            self.carried = 0
+        else:
+            self.counts['caught'] += 1
+            self.carried += 1
+
+    def advance(self, seconds):
+        """Let game time pass with the cursor where it is."""
+        end = self.clock + seconds
+        self._throw(end)
+        self.objects.sort(key=lambda item: item[0])
+        while self.objects and self.objects[0][0] <= end:
+            lands, thrown, kind, lane = self.objects.pop(0)
+            self._land(kind, lane)
+        self.clock = end
+
+    def move_to(self, x):
+        self.cursor = x - GAME_REGION[0]
+        self.counts['inputs'] += 1
+        self.advance(INPUT_SECONDS)
+
+    def click(self, clicks):
+        if self.penguin_lane() == 'left':
+            dropped = min(clicks, self.carried)
+            self.carried -= dropped
+            self.counts['delivered'] += dropped
+        self.counts['inputs'] += clicks
+        self.advance(INPUT_SECONDS)
+
+    def render(self):
+        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        bottom = int(LANDING_HEIGHT * self.height) - OBJECT_SIZE
+        for lands, thrown, kind, lane in self.objects:
+            if thrown > self.clock:
+                continue
+            y = int((self.clock - thrown) / FALL_SECONDS * bottom)
+            x = self.lane_x[lane] - OBJECT_SIZE // 2
+            frame[y:y + OBJECT_SIZE, x:x + OBJECT_SIZE] = COLORS[kind]
+        return frame
+
+def simulate(strategy, minutes, seed, scenario='sparse'):
+    """Play for a number of simulated minutes and return the counts per minute."""
+    simulation = Simulation(seed, SCENARIOS[scenario])
+    _Inputs.simulation = simulation
+    BeanCounter.move_penguin = STRATEGIES[strategy]
+    # The bot's clock follows the simulation, so its timing settings mean game time
+    real_time = BeanCounter.time
+    BeanCounter.time = types.SimpleNamespace(time=lambda: simulation.clock, sleep=simulation.advance)
+    BeanCounter.start_game_stats()
+    try:
+        while simulation.clock < minutes * 60:
+            BeanCounter.play_frame(simulation.render())
+            simulation.advance(FRAME_SECONDS)
+    finally:
+        BeanCounter.move_penguin = STRATEGIES['planner']
+        BeanCounter.time = real_time
+    # What the bot credits coins for, to compare with what was really delivered
+    simulation.counts['counted'] = BeanCounter.catches - BeanCounter.lost_bags
+    return {name: count / (simulation.clock / 60) for name, count in simulation.counts.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Bean Counter deposit strategies in a simulated game")
+    parser.add_argument('--minutes', type=float, default=5, help="Simulated minutes per strategy and scenario")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenario', choices=list(SCENARIOS), help="Only run this scenario")
+    args = parser.parse_args()
+
+    # Every detector runs on every simulated frame; the scheduler's rates are in wall-clock time
+    BeanCounter.DETECTOR_BUDGET = 1.0
+    BeanCounter.BEAN_BAG_MIN_RATE = BeanCounter.ONEUP_MIN_RATE = BeanCounter.EARNINGS_MIN_RATE = float('inf')
+    BeanCounter.build_detector_scheduler()
+    BeanCounter.GAME_REGION = GAME_REGION
+    BeanCounter.on_game_end = lambda: None
+
+    for scenario in [args.scenario] if args.scenario else SCENARIOS:
+        results = {strategy: simulate(strategy, args.minutes, args.seed, scenario) for strategy in STRATEGIES}
+
+        names = list(results['planner'])
+        print(f"{scenario + ', per minute':<26}" + ''.join(f"{name:>11}" for name in names))
+        for strategy, rates in results.items():
+            print(f"  {strategy:<24}" + ''.join(f"{rates[name]:11.1f}" for name in names))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Benchmark of the per-frame detection and decision functions, with a regression gate.
+
+Frames are generated with a controlled number of objects in each game's colours, so the
+suite runs headless: pyautogui is replaced by a stub before the game scripts are imported
+and nothing is ever drawn. Detector scheduling is turned off, so every detector is timed on
+every call.
+
+Usage (from the repository root):
+    python -m Benchmarks.DetectorBenchmark --update-baseline   # record this host's baseline
+    python -m Benchmarks.DetectorBenchmark                     # compare, exit 1 on a regression
+    python -m Benchmarks.DetectorBenchmark --quick --filter detect_corner
+"""
+import os
+import sys
+import json
+import time
+import types
+import socket
+import argparse
+import numpy as np
+
+def _install_input_stub():
+    """Replace pyautogui with no-ops so the game scripts import and run without a display."""
+    stub = types.ModuleType('pyautogui')
+    for name in ['moveTo', 'click', 'keyDown', 'keyUp', 'press']:
+        setattr(stub, name, lambda *args, **kwargs: None)
+    stub.position = lambda: (0, 0)
+    sys.modules['pyautogui'] = stub
+
+_install_input_stub()
+
+from BeanCounter import BeanCounter
+from CartSurfer import CartSurfer
+
+BASELINE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAME_REGIONS = [(802, 502), (1215, 763), (1920, 1080)]  # Full game region sizes, smallest to largest
+DETECTION_SCALES = [1, 2, 4]
+DENSITIES = {'sparse': 1, 'dense': 8}                     # Objects of each kind per frame
+FRAMES_PER_CASE = 16                                      # Distinct frames cycled through while timing
+DEFAULT_TOLERANCE = 0.25                                  # Allowed slowdown against the baseline
+QUICK_REPEATS, FULL_REPEATS = 3, 7
+REPEAT_SECONDS = 0.05                                     # Roughly how long each timed repeat runs
+
+def baseline_path():
+    return os.path.join(BASELINE_DIR, f"baseline-{socket.gethostname()}.json")
+
+def noise_frame(rng, width, height):
+    """Dark, slightly noisy background that matches none of the colour ranges."""
+    return rng.integers(0, 40, (height, width, 3), dtype=np.uint8)
+
+def bean_counter_frames(rng, region, scale, count):
+    """
+    Frames of Bean Counter's capture area (0.66 x 0.45 of the region). Every frame has bean bags
+    and oneups; every fourth also has fish, anvils and pots, so all decision branches are timed.
+    """
+    width, height = int(region[0] * 0.66) // scale, int(region[1] * 0.45) // scale
+    size = max(2, 24 // scale)
+    desirables = [
+        (BeanCounter.BEAN_BAG_COLOR_LOWER + BeanCounter.BEAN_BAG_COLOR_UPPER) // 2,
+        (BeanCounter.ONEUP_COLOR_LOWER + BeanCounter.ONEUP_COLOR_UPPER) // 2,
+    ]
+    hazards = [
+        (BeanCounter.FISH_COLOR_LOWER + BeanCounter.FISH_COLOR_UPPER) // 2,
+        (BeanCounter.ANVIL_COLOR_LOWER + BeanCounter.ANVIL_COLOR_UPPER) // 2,
+        (BeanCounter.POT_COLOR_LOWER + BeanCounter.POT_COLOR_UPPER) // 2,
+    ]
+
+    frames = []
+    for index in range(FRAMES_PER_CASE):
+        frame = noise_frame(rng, width, height)
+        for color in desirables + (hazards if index % 4 == 0 else []):
+            for _ in range(count):
+                x, y = rng.integers(0, width - size), rng.integers(0, height - size)
+                frame[y:y + size, x:x + size] = color
+        frames.append(frame)
+    return frames
+
+def cart_surfer_frames(rng, region, scale, count):
+    """Frames of the whole Cart Surfer region with indicator patches and a varying corner patch."""
+    width, height = region[0] // scale, region[1] // scale
+    size = max(2, 40 // scale)
+    indicator = (CartSurfer.INDICATOR_COLOR_LOWER + CartSurfer.INDICATOR_COLOR_UPPER) // 2
+
+    frames = []
+    for index in range(FRAMES_PER_CASE):
+        frame = noise_frame(rng, width, height)
+        for _ in range(count):
+            x, y = rng.integers(0, width - size), rng.integers(0, height - size)
+            frame[y:y + size, x:x + size] = indicator
+        # Alternate the corner patch between dark and corner-bright, staying below the game end level
+        if index % 2:
+            frame[int(height*0.4):int(height*0.45), int(width*0.35):int(width*0.4)] = 150
+        frames.append(frame)
+    return frames
+
+def time_call(function, inputs, repeats):
+    """Median over repeats of the mean microseconds per call, cycling through the inputs."""
+    # One untimed pass warms up, and its duration sizes the timed repeats
+    start = time.perf_counter()
+    for arguments in inputs:
+        function(*arguments)
+    loops = max(1, int(REPEAT_SECONDS / (time.perf_counter() - start)))
+    
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            for arguments in inputs:
+                function(*arguments)
+        samples.append((time.perf_counter() - start) * 1e6 / (loops * len(inputs)))
+    return float(np.median(samples))
+
+FUNCTIONS = ['find_objects', 'detect_objects', 'determine_action', 'detect_turn_indicators', 'detect_corner', 'play_frame']
+
+def cases(name_filter=''):
+    """Yield (name, function, inputs) for every benchmark case, only generating frames for cases that will run."""
+    rng = np.random.default_rng(0)
+    for region in GAME_REGIONS:
+        for scale in DETECTION_SCALES:
+            for density, count in DENSITIES.items():
+                suffix = f"{region[0]}x{region[1]}/scale{scale}/{density}"
+                if not any(name_filter in f"{function}/{suffix}" for function in FUNCTIONS):
+                    continue
+
+                frames = bean_counter_frames(rng, region, scale, count)
+                width = frames[0].shape[1]
+                masks = [(BeanCounter.cv2.inRange(frame, BeanCounter.BEAN_BAG_COLOR_LOWER, BeanCounter.BEAN_BAG_COLOR_UPPER),) for frame in frames]
+                detections = [BeanCounter.detect_objects(frame) + (width,) for frame in frames]
+                yield f"find_objects/{suffix}", BeanCounter.find_objects, masks
+                yield f"detect_objects/{suffix}", BeanCounter.detect_objects, [(frame,) for frame in frames]
+                yield f"determine_action/{suffix}", BeanCounter.determine_action, detections
+
+                frames = cart_surfer_frames(rng, region, scale, count)
+                yield f"detect_turn_indicators/{suffix}", CartSurfer.detect_turn_indicators, [(frame,) for frame in frames]
+                yield f"detect_corner/{suffix}", CartSurfer.detect_corner, [(frame,) for frame in frames]
+                yield f"play_frame/{suffix}", CartSurfer.play_frame, [(frame,) for frame in frames]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detectors and fail on regressions against a stored baseline")
+    parser.add_argument('--baseline', default=baseline_path(), help="Baseline JSON file (default: per host)")
+    parser.add_argument('--update-baseline', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown, e.g. 0.25 for 25%%")
+    parser.add_argument('--filter', default='', help="Only run cases whose name contains this")
+    parser.add_argument('--quick', action='store_true', help="Fewer repeats, for a fast check")
+    args = parser.parse_args()
+
+    # Game end handling must never fire during a benchmark
+    BeanCounter.on_game_end = CartSurfer.on_game_end = lambda: None
+    # Run every detector on every call. In this tight loop the scheduler would skip the rate-limited
+    # ones almost every time, so a slowdown in them would never reach the gate
+    BeanCounter.DETECTOR_BUDGET = CartSurfer.DETECTOR_BUDGET = float('inf')
+    BeanCounter.BEAN_BAG_MIN_RATE = BeanCounter.ONEUP_MIN_RATE = BeanCounter.EARNINGS_MIN_RATE = float('inf')
+    CartSurfer.INDICATOR_MIN_RATE = float('inf')
+    BeanCounter.build_detector_scheduler()
+    CartSurfer.build_detector_scheduler()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    repeats = QUICK_REPEATS if args.quick else FULL_REPEATS
+    results = {}
+    regressions = []
+    print(f"{'case':<60} {'us/call':>10} {'baseline':>10} {'change':>8}")
+    for name, function, inputs in cases(args.filter):
+        if args.filter not in name:
+            continue
+        results[name] = time_call(function, inputs, repeats)
+
+        line = f"{name:<60} {results[name]:10.1f}"
+        if name in baseline:
+            change = results[name] / baseline[name] - 1
+            line += f" {baseline[name]:10.1f} {change:+8.0%}"
+            if change > args.tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=4, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+    elif regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+    else:
+        print(f"No case slower than the baseline by more than {args.tolerance:.0%}")
+
+if __name__ == "__main__":
+    main()
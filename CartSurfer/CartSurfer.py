@@ -5,15 +5,30 @@ import cv2
 import sys
 import platform
 import threading
-import mss
+import os
+
+# Shared modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Common.Latency import measure_input_latency, summarize_latency, format_latency
+from Common.Recording import FrameRecorder
+from Common.ScreenCapture import create_capture
+from Common.EventLog import EventLog
+from Common.DetectorScheduler import DetectorScheduler
+from Common.Outcomes import OutcomeLog
+from Common.Profiles import profile_path, load_profile, save_profile, settings_profile, apply_settings, profile_id, ProfileWatcher
 
 # Configuration variables
+GAME_NAME = 'CartSurfer'
+ROOM_NAME = 'Mine'  # Room the game is entered from
 GAME_REGION = None  # Will be set by calibration
 START_KEY = 'f8'    # Key to start/stop the bot
 PAUSE_KEY = 'f10'   # Key to pause/unpause the bot
 DEBUG_KEY = 'd'     # Key to toggle debug mode
 QUIT_KEY = 'q'      # Key to quit program
+LATENCY_KEY = 'l'   # Key to measure input-to-screen latency
+RECORD_KEY = 'r'    # Key to start/stop recording frames for offline tuning
 DETECTION_SCALE = 4 # For speed
+DEBUG_LOG_FILE = None # Write debug events to this file (rotated) instead of the terminal
 
 # Color detection thresholds (BGR format for OpenCV)
 # Yellow turning indicators (adjust as needed based on your game's colors)
@@ -24,6 +39,24 @@ INDICATOR_COLOR_UPPER = np.array([80, 255, 255])
 CORNER_BRIGHTNESS_THRESHOLD = 110
 GAME_FINISH_BRIGHTNESS_THRESHOLD = 180
 
+# Timing windows in seconds (see EvaluatePolicy.py for tuning these offline)
+INDICATOR_TIMEOUT = 1.0  # Forget a turn indicator this long after it was last seen
+CORNER_WINDOW = 0.8      # Keep turning this long after the corner patch was last bright
+TRICK_INTERVAL = 1.0     # Minimum time between tricks
+COINS_PER_TRICK = None   # Coins earned per trick on the end screen, used to compare games; None until measured
+
+# Detector scheduling. Corners are checked every frame; indicators whenever the budget allows, and at least at this rate (Hz)
+DETECTOR_BUDGET = 0.004   # Seconds per frame for detection
+INDICATOR_MIN_RATE = 15
+
+# Button positions used to restart the game, as fractions of the game region
+RESTART_BUTTONS = {
+    'exit': (832/1186, 101/746),
+    'minecarts': (993/1186, 239/746),
+    'confirm_play': (508/1186, 343/746),
+    'start_game': (998/1186, 591/746),
+}
+
 # Global variables
 running = False
 paused = False
@@ -34,6 +67,32 @@ last_indicator = 'none'
 last_indicator_time = 0
 last_corner_time = 0
 last_trick_time = 0
+latency_calibration_requested = False
+recorder = FrameRecorder('CartSurfer')
+event_log = EventLog('CartSurfer')
+INPUT_LATENCY = 0.0   # Measured input-to-screen latency in seconds (0 until calibrated)
+last_brightness = None # (brightness, time) of the corner patch on the previous frame
+tricks = 0             # Tricks performed this game
+on_game_end = None     # Set by the unified runtime to take over restarting
+detector_scheduler = None # Built by build_detector_scheduler
+outcome_log = OutcomeLog() # Finished games, for reports (see Common/Outcomes.py)
+game_started_at = None # When this game started
+detections = 0         # Indicators and corners seen this game, summed over frames
+actions = 0            # Input events sent this game
+errors = 0             # Errors caught by the game loop this game
+
+# Settings stored in this host's tuning profile (see Common/Profiles.py)
+PROFILE_SETTINGS = [
+    'GAME_REGION', 'DETECTION_SCALE', 'INDICATOR_COLOR_LOWER', 'INDICATOR_COLOR_UPPER',
+    'CORNER_BRIGHTNESS_THRESHOLD', 'GAME_FINISH_BRIGHTNESS_THRESHOLD',
+    'INDICATOR_TIMEOUT', 'CORNER_WINDOW', 'TRICK_INTERVAL', 'INPUT_LATENCY', 'RESTART_BUTTONS',
+    'COINS_PER_TRICK', 'DETECTOR_BUDGET', 'INDICATOR_MIN_RATE',
+]
+
+# Settings measured rather than tuned. Outcomes are grouped by a hash of the
+# other settings, so recalibrating doesn't look like a new profile (see game_outcome)
+CALIBRATION_SETTINGS = ['GAME_REGION', 'INPUT_LATENCY', 'RESTART_BUTTONS', 'COINS_PER_TRICK']
+TUNING_SETTINGS = [name for name in PROFILE_SETTINGS if name not in CALIBRATION_SETTINGS]
 
 def cross_platform_key_listener():
     """Platform-independent key listener implementation"""
@@ -46,6 +105,8 @@ def cross_platform_key_listener():
         keyboard.on_press_key(PAUSE_KEY, lambda _: toggle_pause())
         keyboard.on_press_key(DEBUG_KEY, lambda _: toggle_debug())
         keyboard.on_press_key(QUIT_KEY, lambda _: trigger_exit())
+        keyboard.on_press_key(LATENCY_KEY, lambda _: request_latency_calibration())
+        keyboard.on_press_key(RECORD_KEY, lambda _: recorder.toggle())
         
         print(f"Using keyboard library for key detection")
         
@@ -69,6 +130,10 @@ def cross_platform_key_listener():
                             trigger_exit()
                         elif key.char.lower() == DEBUG_KEY:
                             toggle_debug()
+                        elif key.char.lower() == LATENCY_KEY:
+                            request_latency_calibration()
+                        elif key.char.lower() == RECORD_KEY:
+                            recorder.toggle()
                     # Handle function keys
                     elif hasattr(key, 'name'):
                         if key.name == START_KEY:
@@ -135,13 +200,13 @@ def detect_turn_indicators(frame):
     left_region = mask[:, :width//3]
     left_indicator = cv2.countNonZero(left_region) > 100  # Adjust threshold as needed
     if debug_mode and left_indicator:
-        print("Detected left indicator")
+        event_log.log("Detected left indicator")
     
     # Right side region
     right_region = mask[:, 2*width//3:]
     right_indicator = cv2.countNonZero(right_region) > 100  # Adjust threshold as needed
     if debug_mode and right_indicator:
-        print("Detected right indicator")
+        event_log.log("Detected right indicator")
     
     # Debug visualization
     if debug_mode:
@@ -156,23 +221,46 @@ def detect_turn_indicators(frame):
     
     return left_indicator, right_indicator
 
-def detect_corner(frame):
-    """Detect if we're approaching or in a corner (brighter area)."""
+def corner_brightness(frame):
+    """Average brightness of the patch used to detect corners."""
     # Convert to grayscale and check brightness
     height, width = frame.shape[:2]
     gray = cv2.cvtColor(frame[int(height*0.4):int(height*0.45), int(width*0.35):int(width*0.4)], cv2.COLOR_BGR2GRAY)
-    avg_brightness = np.mean(gray)
+    return np.mean(gray)
+
+def detect_corner(frame):
+    """Detect if we're approaching or in a corner (brighter area)."""
+    global last_brightness
+    
+    avg_brightness = corner_brightness(frame)
     
     # If brightness is above threshold, we're likely in a corner
     is_corner = avg_brightness > CORNER_BRIGHTNESS_THRESHOLD
     
+    # Start the turn early if the patch is brightening fast enough to pass the
+    # threshold before an input sent now would reach the game
+    now = time.time()
+    if not is_corner and last_brightness is not None and INPUT_LATENCY > 0:
+        previous_brightness, previous_time = last_brightness
+        elapsed = now - previous_time
+        if 0 < elapsed < 0.2:
+            rate = (avg_brightness - previous_brightness) / elapsed
+            if rate > 0 and avg_brightness + rate * INPUT_LATENCY > CORNER_BRIGHTNESS_THRESHOLD:
+                is_corner = True
+                if debug_mode:
+                    event_log.log("Corner predicted: Brightness {} rising {:.0f}/s", avg_brightness, rate)
+    last_brightness = (avg_brightness, now)
+    
     if avg_brightness > GAME_FINISH_BRIGHTNESS_THRESHOLD:
         if debug_mode: 
-            print(f"Detected game end: Brightness {avg_brightness}")
-        restart_game_sequence()
+            event_log.log("Detected game end: Brightness {}", avg_brightness)
+        if on_game_end is not None:
+            on_game_end()
+        else:
+            restart_game_sequence()
     
     if debug_mode and is_corner:
-        print(f"Corner detected: Brightness {avg_brightness}")
+        event_log.log("Corner detected: Brightness {}", avg_brightness)
     
     return is_corner
 
@@ -183,6 +271,8 @@ def perform_tricks(left_indicator, right_indicator, is_corner):
     global last_indicator_time
     global last_corner_time
     global last_trick_time
+    global tricks
+    global actions
     
     # Measurements of indicators and corners
     if left_indicator:
@@ -196,22 +286,26 @@ def perform_tricks(left_indicator, right_indicator, is_corner):
     if is_corner:
         last_corner_time = time.time()
         
-    if time.time() - last_indicator_time > 1:
+    if time.time() - last_indicator_time > INDICATOR_TIMEOUT:
         last_indicator = 'none'
     
     # Analysis of measurements
-    if time.time() - last_corner_time < 0.8:
+    if time.time() - last_corner_time < CORNER_WINDOW:
         pyautogui.keyDown('down')
+        actions += 1
         if last_indicator == 'left':
             pyautogui.keyDown('right')
+            actions += 1
             return
         elif last_indicator == 'right':
             pyautogui.keyDown('left')
+            actions += 1
             return
     elif last_indicator != 'none':
         pyautogui.keyUp('down')
         pyautogui.keyUp('right')
         pyautogui.keyUp('left')
+        actions += 3
         return
     
     # No indicators, perform alternating tricks
@@ -219,11 +313,12 @@ def perform_tricks(left_indicator, right_indicator, is_corner):
         # Release any held keys first
         for key in ['down', 'left', 'right', 'space']:
             pyautogui.keyUp(key)
+        actions += 4
         
         # Perform the current trick
-        if current_trick == 0 and time.time() - last_trick_time > 1:
+        if current_trick == 0 and time.time() - last_trick_time > TRICK_INTERVAL:
             if debug_mode:
-                print("Performing trick 1: down arrow -> space")
+                event_log.log("Performing trick 1: down arrow -> space")
             
             pyautogui.keyDown('down')
             pyautogui.keyUp('down')
@@ -232,9 +327,11 @@ def perform_tricks(left_indicator, right_indicator, is_corner):
             
             current_trick = 1
             last_trick_time = time.time()
-        elif current_trick == 1 and time.time() - last_trick_time > 1:
+            tricks += 1
+            actions += 4
+        elif current_trick == 1 and time.time() - last_trick_time > TRICK_INTERVAL:
             if debug_mode:
-                print("Performing trick 2: space -> right arrow")
+                event_log.log("Performing trick 2: space -> right arrow")
             
             pyautogui.keyDown('space')
             pyautogui.keyDown('right')
@@ -243,6 +340,8 @@ def perform_tricks(left_indicator, right_indicator, is_corner):
             
             current_trick = 0
             last_trick_time = time.time()
+            tricks += 1
+            actions += 4
 
 def toggle_running():
     """Toggle the running state of the bot."""
@@ -256,24 +355,139 @@ def toggle_pause():
     paused = not paused
     print(f"Bot {'paused' if paused else 'resumed'}")
 
+def request_latency_calibration():
+    """Ask the main loop to measure input latency before the next frame."""
+    global latency_calibration_requested
+    latency_calibration_requested = True
+    print("Latency calibration requested")
+
 def toggle_debug():
     """Toggle debug mode to show object detection visualization."""
     global debug_mode
     debug_mode = not debug_mode
     print(f"Debug mode {'enabled' if debug_mode else 'disabled'}")
 
-def restart_game_sequence():
-    global exit_program
+def build_detector_scheduler():
+    """Set up which detectors run on which frames."""
+    global detector_scheduler
+    scheduler = DetectorScheduler(DETECTOR_BUDGET)
+    scheduler.add('corner', detect_corner, critical=True, initial=False)
+    scheduler.add('indicators', detect_turn_indicators, min_rate=INDICATOR_MIN_RATE, initial=(False, False))
+    detector_scheduler = scheduler
+
+build_detector_scheduler()
+
+def apply_profile(profile):
+    """
+    Apply a tuning profile, rebuilding the scheduler only if its settings changed.
+    Raises ValueError and keeps the previous settings if the profile is invalid.
+    """
+    previous = {name: globals()[name] for name in PROFILE_SETTINGS}
+    changed = apply_settings(globals(), PROFILE_SETTINGS, profile)
+    try:
+        if DETECTION_SCALE < 1:
+            raise ValueError(f"DETECTION_SCALE must be at least 1, got {DETECTION_SCALE}")
+        if COINS_PER_TRICK is not None and not COINS_PER_TRICK > 0:
+            raise ValueError(f"COINS_PER_TRICK must be positive, got {COINS_PER_TRICK}")
+        if any(name.endswith(('_RATE', '_BUDGET')) for name in changed):
+            build_detector_scheduler()
+        if GAME_REGION is not None:
+            capture_monitor()
+    except Exception as e:
+        globals().update(previous)
+        build_detector_scheduler()
+        raise ValueError(f"{type(e).__name__}: {e}") from e
+    return changed
+
+def capture_monitor():
+    """Area of the screen the bot watches."""
+    return {
+        "left": GAME_REGION[0],
+        "top": GAME_REGION[1],
+        "width": GAME_REGION[2],
+        "height": GAME_REGION[3]
+    }
+
+def calibrate_input_latency(sct, monitor):
+    """Tap the jump key and measure how long the cart takes to visibly react."""
+    global INPUT_LATENCY
+    
+    def grab():
+        return cv2.cvtColor(sct.grab(monitor), cv2.COLOR_BGRA2BGR)
     
-    def manage_exit_on_long_sleeps():
-        if exit_program == True:
-            raise KeyboardInterrupt
+    def probe(index):
+        pyautogui.keyDown('space')
+        pyautogui.keyUp('space')
+    
+    print("Measuring input latency, start a game and keep the window visible...")
+    summary = summarize_latency(measure_input_latency(grab, probe, settle=1.0, should_abort=lambda: exit_program))
+    print(f"Input latency: {format_latency(summary)}")
+    
+    if summary is not None:
+        INPUT_LATENCY = summary['median']
+
+def play_frame(frame):
+    """Detect and act for one captured frame."""
+    global detections, game_started_at
     
+    if game_started_at is None:
+        game_started_at = time.time()
+    
+    # Corners are checked on every frame; the indicators may be an earlier frame's result
+    results = detector_scheduler.run(frame)
+    left_indicator, right_indicator = results['indicators']
+    is_corner = results['corner']
+    detections += left_indicator + right_indicator + is_corner
+    
+    # Perform appropriate actions
+    perform_tricks(left_indicator, right_indicator, is_corner)
+
+def start_game_stats():
+    """Reset the per-game counters."""
+    global tricks, game_started_at, detections, actions, errors
+    tricks = 0
+    game_started_at = time.time()
+    detections = actions = errors = 0
+    detector_scheduler.reset()
+
+def coins_this_game():
+    """Estimated coins earned this game, or None if COINS_PER_TRICK hasn't been measured."""
+    if COINS_PER_TRICK is None:
+        return None
+    return tricks * COINS_PER_TRICK
+
+def game_summary():
+    """What coins_this_game is counted from, for measuring COINS_PER_TRICK against the end screen."""
+    return f"{tricks} tricks"
+
+def game_outcome():
+    """This game's row for the outcome database. The score isn't read from the end screen."""
+    return {
+        'game': GAME_NAME,
+        'profile': profile_id(settings_profile(globals(), TUNING_SETTINGS)),
+        'started': game_started_at if game_started_at is not None else time.time(),
+        'ended': time.time(),
+        'detections': detections,
+        'actions': actions,
+        'errors': errors,
+        'coins': coins_this_game(),
+    }
+
+def release_inputs():
+    """Release all pressed keys."""
+    for key in ['down', 'left', 'right', 'space']:
+        pyautogui.keyUp(key)
+
+def manage_exit_on_long_sleeps():
+    if exit_program == True:
+        raise KeyboardInterrupt
+
+def exit_game():
+    """Wait for the end screen and leave it, back into the Mine."""
     game_region = GAME_REGION
-    ExitButtonPos = (832/1186, 101/746)
-    MinecartsPos = (993/1186, 239/746)
-    ConfirmPlayPos = (508/1186, 343/746)
-    StartGamePos = (998/1186, 591/746)
+    ExitButtonPos = RESTART_BUTTONS['exit']
+    
+    release_inputs()
     
     #Wait for exit screen
     time.sleep(2)
@@ -284,6 +498,14 @@ def restart_game_sequence():
     pyautogui.click()
     time.sleep(1)
     manage_exit_on_long_sleeps()
+
+def enter_game():
+    """Start a new game from inside the Mine."""
+    game_region = GAME_REGION
+    MinecartsPos = RESTART_BUTTONS['minecarts']
+    ConfirmPlayPos = RESTART_BUTTONS['confirm_play']
+    StartGamePos = RESTART_BUTTONS['start_game']
+    
     # Click on Minecarts
     pyautogui.moveTo(game_region[0] + game_region[2] * MinecartsPos[0], game_region[1] + game_region[3] * MinecartsPos[1])
     pyautogui.click()
@@ -298,8 +520,16 @@ def restart_game_sequence():
     pyautogui.moveTo(game_region[0] + game_region[2] * StartGamePos[0], game_region[1] + game_region[3] * StartGamePos[1])
     pyautogui.click()
 
+def restart_game_sequence():
+    outcome = game_outcome()
+    exit_game()
+    enter_game()
+    outcome['restart_seconds'] = time.time() - outcome['ended']
+    outcome_log.record(outcome)
+    start_game_stats()
+
 def main():
-    global running, paused, GAME_REGION, exit_program
+    global running, paused, GAME_REGION, exit_program, latency_calibration_requested, errors
     
     # Set pyautogui settings for faster movement
     pyautogui.PAUSE = 0.01
@@ -311,43 +541,74 @@ def main():
     print(f"Press {START_KEY} to start/stop")
     print(f"Press {PAUSE_KEY} to pause/resume")
     print(f"Press {DEBUG_KEY} to toggle debug mode")
+    print(f"Press {LATENCY_KEY} to measure input latency")
+    print(f"Press {RECORD_KEY} to start/stop recording frames")
     print(f"Press {QUIT_KEY} to quit")
     
+    # Debug output is written from a background thread so it can't stall the game loop
+    event_log.start(DEBUG_LOG_FILE)
+    outcome_log.start()
+    
     # Start key listener in a separate thread
     listener_thread = threading.Thread(target=cross_platform_key_listener)
     listener_thread.daemon = True
     listener_thread.start()
     
-    # Calibrate game region
-    GAME_REGION = calibrate_game_region()
-    sct = mss.mss()
+    # Load this host's profile, calibrating the game region only if it has none
+    profile_file = profile_path('CartSurfer')
+    try:
+        profile = load_profile(profile_file)
+    except (ValueError, OSError) as e:
+        print(f"Could not read profile {profile_file}: {e}")
+        profile = None
+    if profile is not None:
+        try:
+            apply_profile(profile)
+            print(f"Loaded profile {profile_file}")
+        except ValueError as e:
+            print(f"Could not apply profile {profile_file}: {e}")
+    if GAME_REGION is None:
+        GAME_REGION = calibrate_game_region()
+        save_profile(profile_file, settings_profile(globals(), PROFILE_SETTINGS))
+        print(f"Saved profile {profile_file}")
+    profile_watcher = ProfileWatcher(profile_file)
+    
+    sct = create_capture()
+    monitor = capture_monitor()
     
     try:
         while not exit_program:
+            # Pick up profile edits between frames
+            profile = profile_watcher.take()
+            if profile is not None:
+                try:
+                    changed = apply_profile(profile)
+                    monitor = capture_monitor()
+                    print(f"Reloaded profile, changed: {', '.join(changed) if changed else 'nothing'}")
+                except ValueError as e:
+                    print(f"Ignoring invalid profile, keeping the previous settings: {e}")
+            
+            if latency_calibration_requested:
+                latency_calibration_requested = False
+                calibrate_input_latency(sct, monitor)
+                save_profile(profile_file, settings_profile(globals(), PROFILE_SETTINGS))
+                profile_watcher.saved()
+            
             if running and not paused:
                 try:
                     # Capture the game screen
-                    monitor = {
-                        "left": GAME_REGION[0],
-                        "top": GAME_REGION[1],
-                        "width": GAME_REGION[2],
-                        "height": GAME_REGION[3]
-                    }
-                    screenshot = np.array(sct.grab(monitor))
+                    screenshot = sct.grab(monitor)
                     
                     # Convert from RGB to BGR (for OpenCV)
                     frame = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR)
                     frame = cv2.resize(frame, (frame.shape[1]//DETECTION_SCALE, frame.shape[0]//DETECTION_SCALE))
+                    recorder.add(frame)
                     
-                    # Detect turn indicators and corners
-                    left_indicator, right_indicator = detect_turn_indicators(frame)
-                    is_corner = detect_corner(frame)
-                    
-                    # Perform appropriate actions
-                    perform_tricks(left_indicator, right_indicator, is_corner)
+                    play_frame(frame)
                     
                 except Exception as e:
-                    print(f"Error during gameplay: {e}")
+                    event_log.log("Error during gameplay: {}", e)
+                    errors += 1
                     time.sleep(1)  # Pause briefly on error
             
             # Small delay to reduce CPU usage
@@ -358,9 +619,11 @@ def main():
     finally:
         # Clean up
         exit_program = True
+        event_log.stop()
+        outcome_log.stop()
+        profile_watcher.stop()
         # Release all pressed keys
-        for key in ['down', 'left', 'right', 'space']:
-            pyautogui.keyUp(key)
+        release_inputs()
         if debug_mode:
             cv2.destroyAllWindows()
 
@@ -0,0 +1,154 @@
+"""
+Offline tuning of the Cart Surfer turn timing windows.
+
+Indicators and corner brightness are computed once for a recorded session (press r while
+the bot plays), then perform_tricks is replayed over the recorded timestamps for every
+parameter set in a grid at once and the sets are ranked by a proxy score.
+
+TRICK_INTERVAL isn't searched: nothing in a recording shows a trick failing, so the score
+would always favour the shortest interval. Tricks are replayed with the current setting.
+
+Usage: python EvaluatePolicy.py ../recordings/CartSurfer-<date>.npz [--steps 40] [--workers 4] [--top 10]
+"""
+import argparse
+import time
+import numpy as np
+from multiprocessing import Pool
+
+import CartSurfer as game  # Also puts the repository root on the path for Common
+from Common.Recording import load_recording
+
+TURN_PENALTY = 10  # A crash in a corner costs about this many tricks
+TURN_GRACE = 0.3   # Turning for longer than this after the corner has passed counts as mistimed
+CHUNK_SIZE = 512   # Parameter sets evaluated per worker task
+
+NONE, LEFT, RIGHT = 0, 1, 2
+
+def extract_features(frames, times):
+    """Run detection once per frame and return the per-frame arrays the policy needs."""
+    count = len(frames)
+    left = np.zeros(count, dtype=bool)
+    right = np.zeros(count, dtype=bool)
+    brightness = np.zeros(count)
+
+    for index, frame in enumerate(frames):
+        left[index], right[index] = game.detect_turn_indicators(frame)
+        brightness[index] = game.corner_brightness(frame)
+
+    corner = brightness > game.CORNER_BRIGHTNESS_THRESHOLD
+
+    # Number each corner and remember which corner each frame comes after
+    starts = corner & ~np.insert(corner[:-1], 0, False)
+    episode = np.cumsum(starts) - 1
+    last_corner_seen = np.where(corner, times, -np.inf)
+    last_corner_seen = np.maximum.accumulate(last_corner_seen)
+
+    return {
+        'times': times, 'left': left, 'right': right, 'corner': corner,
+        'episode': episode, 'episodes': int(starts.sum()), 'last_corner_seen': last_corner_seen,
+    }
+
+def simulate(features, indicator_timeout, corner_window, trick_interval=None):
+    """
+    perform_tricks as a pure function over a recorded session. The parameters are arrays of
+    length P and the session is replayed once with all P parameter sets stepped together.
+    Returns tricks performed, corners passed without turning and corners turned for too long.
+    """
+    if trick_interval is None:
+        trick_interval = game.TRICK_INTERVAL
+    count = len(indicator_timeout)
+    last_indicator = np.full(count, NONE)
+    last_indicator_time = np.zeros(count)
+    last_corner_time = np.zeros(count)
+    last_trick_time = np.zeros(count)
+    tricks = np.zeros(count, dtype=np.int64)
+    turned = np.zeros((count, features['episodes']), dtype=bool)
+    overran = np.zeros((count, features['episodes']), dtype=bool)
+
+    for index, now in enumerate(features['times']):
+        if features['left'][index]:
+            last_indicator[:] = LEFT
+            last_indicator_time[:] = now
+        if features['right'][index]:
+            last_indicator[:] = RIGHT
+            last_indicator_time[:] = now
+        if features['corner'][index]:
+            last_corner_time[:] = now
+
+        last_indicator[now - last_indicator_time > indicator_timeout] = NONE
+
+        turning = (now - last_corner_time < corner_window) & (last_indicator != NONE)
+        episode = features['episode'][index]
+        if features['corner'][index]:
+            turned[:, episode] |= turning
+        elif episode >= 0 and now - features['last_corner_seen'][index] > TURN_GRACE:
+            overran[:, episode] |= turning
+
+        trick = (last_indicator == NONE) & (now - last_trick_time > trick_interval)
+        last_trick_time[trick] = now
+        tricks += trick
+
+    missed_turns = features['episodes'] - turned.sum(axis=1)
+    overrun_turns = overran.sum(axis=1)
+    return tricks, missed_turns, overrun_turns
+
+# Session features shared with worker processes
+_features = None
+
+def _init_worker(features):
+    global _features
+    _features = features
+
+def score_chunk(params):
+    """Score a chunk of parameter sets. params is a (P, 2) array of indicator timeout and corner window."""
+    tricks, missed_turns, overrun_turns = simulate(_features, params[:, 0], params[:, 1])
+    score = tricks - TURN_PENALTY * (missed_turns + overrun_turns)
+    return np.column_stack([params, tricks, missed_turns + overrun_turns, score])
+
+def parameter_grid(steps):
+    """Every combination of indicator timeout and corner window."""
+    timeout, window = np.meshgrid(np.linspace(0.3, 2.0, steps), np.linspace(0.2, 1.5, steps), indexing='ij')
+    return np.column_stack([timeout.ravel(), window.ravel()])
+
+def evaluate(features, grid, workers):
+    chunks = [grid[start:start + CHUNK_SIZE] for start in range(0, len(grid), CHUNK_SIZE)]
+    if workers <= 1:
+        _init_worker(features)
+        results = [score_chunk(chunk) for chunk in chunks]
+    else:
+        with Pool(workers, initializer=_init_worker, initargs=(features,)) as pool:
+            results = pool.map(score_chunk, chunks)
+    return np.concatenate(results)
+
+def score_chunk_current(features):
+    """Score the constants currently set in CartSurfer.py."""
+    _init_worker(features)
+    return score_chunk(np.array([[game.INDICATOR_TIMEOUT, game.CORNER_WINDOW]]))[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid-search the Cart Surfer timing windows over a recorded session")
+    parser.add_argument('recording', help="Path to a CartSurfer .npz recording")
+    parser.add_argument('--steps', type=int, default=40, help="Grid steps per parameter")
+    parser.add_argument('--workers', type=int, default=4, help="Worker processes")
+    parser.add_argument('--top', type=int, default=10, help="Number of parameter sets to show")
+    args = parser.parse_args()
+
+    frames, times = load_recording(args.recording)
+    start = time.perf_counter()
+    features = extract_features(frames, times)
+    print(f"Detection on {len(frames)} frames took {time.perf_counter() - start:.1f}s: {features['episodes']} corners")
+
+    grid = parameter_grid(args.steps)
+    start = time.perf_counter()
+    results = evaluate(features, grid, args.workers)
+    print(f"Evaluated {len(grid)} parameter sets in {time.perf_counter() - start:.2f}s")
+
+    current = score_chunk_current(features)
+    print(f"Current settings: tricks {current[2]:.0f}, mistimed turns {current[3]:.0f}, score {current[4]:.0f}")
+
+    print("indicator_timeout corner_window tricks mistimed_turns score")
+    for row in results[np.argsort(-results[:, 4], kind='stable')][:args.top]:
+        print(f"{row[0]:17.2f} {row[1]:13.2f} {row[2]:6.0f} {row[3]:14.0f} {row[4]:5.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+import pyautogui
+import time
+import cv2
+import sys
+import platform
+import threading
+import argparse
+
+from BeanCounter import BeanCounter
+from CartSurfer import CartSurfer
+from Common.ScreenCapture import create_capture
+from Common.ScreenRecognition import screen_signature, recognise_screen
+from Common.Rotation import RotationSchedule
+from Common.Outcomes import OutcomeLog
+from Common.EventLog import EventLog
+from Common.Profiles import profile_path, load_profile, save_profile, settings_profile, apply_settings, ProfileWatcher
+
+# Configuration variables
+GAME_REGION = None  # Will be set by calibration
+START_KEY = 'f8'    # Key to start/stop the bot
+PAUSE_KEY = 'f10'   # Key to pause/unpause the bot
+DEBUG_KEY = 'd'     # Key to toggle debug mode
+QUIT_KEY = 'q'      # Key to quit program
+DEBUG_LOG_FILE = None       # Write the runtime's debug events to this file (rotated) instead of the terminal
+RECOGNITION_INTERVAL = 2.0  # Seconds between screen checks while a game is being played
+ROTATION_ENABLED = True     # Switch games based on coins per hour, once every game's coins per event is set
+SCREEN_SIGNATURES = {}      # Learned screen name -> colour histogram (see --learn)
+TRAVEL_BUTTONS = {}         # 'map' and room names -> positions on the map, as fractions of the game region
+
+# Each game script is a plugin: it provides play_frame, exit_game, enter_game and its own settings
+PLUGINS = [BeanCounter, CartSurfer]
+PLUGINS_BY_GAME = {plugin.GAME_NAME: plugin for plugin in PLUGINS}
+PLUGINS_BY_ROOM = {plugin.ROOM_NAME: plugin for plugin in PLUGINS}
+
+# Settings stored in this host's tuning profile (see Common/Profiles.py)
+PROFILE_SETTINGS = ['GAME_REGION', 'ROTATION_ENABLED', 'SCREEN_SIGNATURES', 'TRAVEL_BUTTONS']
+OPEN_TABLES = ['SCREEN_SIGNATURES', 'TRAVEL_BUTTONS']  # Settings whose screens and rooms can be added or removed
+
+# Global variables
+running = False
+paused = False
+debug_mode = False
+exit_program = False
+active_game = None       # Plugin whose game is on screen
+target_game = None       # Plugin we are travelling to, if switching games
+game_started_at = 0      # When the active game was recognised
+restart_started_at = None  # When the last game ended, to measure restart overhead
+last_recognition = 0
+warned_no_travel = False
+rotation = RotationSchedule([plugin.GAME_NAME for plugin in PLUGINS])
+outcome_log = OutcomeLog()
+event_log = EventLog('ClubPenguinBot')
+finished_outcome = None  # Last game's outcome, recorded once the restart time is known
+
+def cross_platform_key_listener():
+    """Platform-independent key listener implementation"""
+    try:
+        # Try to use keyboard library first (works well on Windows)
+        import keyboard
+        
+        # Set up key handlers with keyboard library
+        keyboard.on_press_key(START_KEY, lambda _: toggle_running())
+        keyboard.on_press_key(PAUSE_KEY, lambda _: toggle_pause())
+        keyboard.on_press_key(DEBUG_KEY, lambda _: toggle_debug())
+        keyboard.on_press_key(QUIT_KEY, lambda _: trigger_exit())
+        
+        print(f"Using keyboard library for key detection")
+        
+        # This will keep running until program ends
+        while not exit_program:
+            time.sleep(0.1)
+    
+    except (ImportError, ValueError, AttributeError) as e:
+        # Fallback to pynput for macOS and Linux
+        print(f"Keyboard library failed: {e}")
+        print("Falling back to pynput for key detection")
+        
+        try:
+            from pynput import keyboard
+            
+            def on_press(key):
+                try:
+                    # Handle regular keys
+                    if hasattr(key, 'char') and key.char:
+                        if key.char.lower() == QUIT_KEY:
+                            trigger_exit()
+                        elif key.char.lower() == DEBUG_KEY:
+                            toggle_debug()
+                    # Handle function keys
+                    elif hasattr(key, 'name'):
+                        if key.name == START_KEY:
+                            toggle_running()
+                        elif key.name == PAUSE_KEY:
+                            toggle_pause()
+                except AttributeError:
+                    # Special keys like function keys
+                    key_name = str(key).replace('Key.', '')
+                    if key_name == START_KEY:
+                        toggle_running()
+                    elif key_name == PAUSE_KEY:
+                        toggle_pause()
+                    elif key_name == 'q':
+                        trigger_exit()
+            
+            # Start listener
+            listener = keyboard.Listener(on_press=on_press)
+            listener.start()
+            
+            # Keep running until program ends
+            while not exit_program:
+                time.sleep(0.1)
+            
+            listener.stop()
+        
+        except ImportError:
+            print("Neither keyboard nor pynput library available.")
+            print("Please install one of them: pip install keyboard pynput")
+            sys.exit(1)
+
+def trigger_exit():
+    """Signal the program (and the game plugins' long restart sequences) to exit"""
+    global exit_program
+    exit_program = True
+    for plugin in PLUGINS:
+        plugin.exit_program = True
+    print("Exiting program...")
+
+def toggle_running():
+    """Toggle the running state of the bot."""
+    global running
+    running = not running
+    print(f"Bot {'started' if running else 'stopped'}")
+
+def toggle_pause():
+    """Toggle the paused state of the bot."""
+    global paused
+    paused = not paused
+    print(f"Bot {'paused' if paused else 'resumed'}")
+
+def toggle_debug():
+    """Toggle debug mode in every game plugin."""
+    global debug_mode
+    debug_mode = not debug_mode
+    for plugin in PLUGINS:
+        plugin.debug_mode = debug_mode
+    print(f"Debug mode {'enabled' if debug_mode else 'disabled'}")
+
+def apply_plugin_profile(plugin, profile):
+    """Apply a game's own profile, keeping the runtime's game region."""
+    plugin.GAME_REGION = GAME_REGION
+    return plugin.apply_profile({name: value for name, value in profile.items() if name != 'GAME_REGION'})
+
+def full_frame(sct):
+    """Capture the whole game region as a BGR frame."""
+    monitor = {"left": GAME_REGION[0], "top": GAME_REGION[1], "width": GAME_REGION[2], "height": GAME_REGION[3]}
+    return cv2.cvtColor(sct.grab(monitor), cv2.COLOR_BGRA2BGR)
+
+def click_relative(position):
+    pyautogui.moveTo(GAME_REGION[0] + GAME_REGION[2] * position[0], GAME_REGION[1] + GAME_REGION[3] * position[1])
+    pyautogui.click()
+
+def coin_rates_known():
+    """Rotation compares coins per hour, so it needs every game's coins per catch or trick."""
+    return all(plugin.coins_this_game() is not None for plugin in PLUGINS)
+
+def can_travel(plugin):
+    return 'map' in TRAVEL_BUTTONS and plugin.ROOM_NAME in TRAVEL_BUTTONS
+
+def travel_to(plugin):
+    """Open the map and go to the room a game is played from."""
+    print(f"Travelling to the {plugin.ROOM_NAME} to play {plugin.GAME_NAME}")
+    click_relative(TRAVEL_BUTTONS['map'])
+    time.sleep(2)
+    click_relative(TRAVEL_BUTTONS[plugin.ROOM_NAME])
+    time.sleep(4)
+
+def start_session(plugin):
+    """A game has been recognised on screen: hand frames to its plugin."""
+    global active_game, target_game, game_started_at, restart_started_at, finished_outcome
+    
+    now = time.time()
+    if restart_started_at is not None and plugin.coins_this_game() is not None:
+        rotation.record_restart(plugin.GAME_NAME, now - restart_started_at)
+        restart_started_at = None
+    if finished_outcome is not None:
+        finished_outcome['restart_seconds'] = now - finished_outcome['ended']
+        outcome_log.record(finished_outcome)
+        finished_outcome = None
+    
+    print(f"Playing {plugin.GAME_NAME}")
+    plugin.start_game_stats()
+    active_game = plugin
+    target_game = None
+    game_started_at = now
+
+def finish_game(plugin):
+    """Called by a plugin when its game ends: record the result and start the next game."""
+    global active_game, target_game, restart_started_at, warned_no_travel, finished_outcome
+    
+    now = time.time()
+    finished_outcome = plugin.game_outcome()
+    coins = plugin.coins_this_game()
+    if coins is not None:
+        rotation.record_game(plugin.GAME_NAME, coins, now - game_started_at)
+        print(f"{plugin.GAME_NAME} finished: {plugin.game_summary()}, about {coins:.0f} coins in {now - game_started_at:.0f}s")
+    else:
+        print(f"{plugin.GAME_NAME} finished: {plugin.game_summary()} in {now - game_started_at:.0f}s")
+    if coin_rates_known():
+        print(f"Rotation: {rotation.summary()}")
+    
+    restart_started_at = now
+    active_game = None
+    plugin.exit_game()
+    
+    next_plugin = PLUGINS_BY_GAME[rotation.next_game(plugin.GAME_NAME)] if ROTATION_ENABLED and coin_rates_known() else plugin
+    if next_plugin is not plugin:
+        if can_travel(next_plugin):
+            target_game = next_plugin
+            travel_to(next_plugin)
+            return
+        if not warned_no_travel:
+            print(f"Can't switch to {next_plugin.GAME_NAME}: add 'map' and '{next_plugin.ROOM_NAME}' positions to TRAVEL_BUTTONS in the profile")
+            warned_no_travel = True
+    
+    plugin.start_game_stats()
+    plugin.enter_game()
+
+def dispatch(screen):
+    """Act on a recognised screen: start playing a game, or enter one from its room."""
+    global active_game
+    
+    if screen in PLUGINS_BY_GAME:
+        if active_game is not PLUGINS_BY_GAME[screen]:
+            start_session(PLUGINS_BY_GAME[screen])
+    elif screen in PLUGINS_BY_ROOM:
+        plugin = PLUGINS_BY_ROOM[screen]
+        active_game = None
+        if target_game is not None and target_game is not plugin and can_travel(target_game):
+            travel_to(target_game)
+        else:
+            print(f"In the {screen}, starting {plugin.GAME_NAME}")
+            plugin.enter_game()
+
+def learn_screen(sct, name):
+    """Store the signature of whatever is on screen now under a game or room name."""
+    print(f"Show the {name} screen in the game window and press Enter...")
+    input()
+    SCREEN_SIGNATURES[name] = screen_signature(full_frame(sct)).tolist()
+    print(f"Learned {name}. Known screens: {', '.join(SCREEN_SIGNATURES)}")
+
+def main():
+    global running, paused, GAME_REGION, exit_program, active_game, last_recognition
+    
+    parser = argparse.ArgumentParser(description="Play Club Penguin minigames, switching between them")
+    parser.add_argument('--learn', choices=list(PLUGINS_BY_GAME) + list(PLUGINS_BY_ROOM),
+                        help="Learn what a game or room looks like, then exit")
+    args = parser.parse_args()
+    
+    # Set pyautogui settings for faster movement
+    pyautogui.PAUSE = 0.01
+    pyautogui.MINIMUM_DURATION = 0
+    pyautogui.MINIMUM_SLEEP = 0
+    
+    # Load this host's runtime profile, calibrating the game region only if it has none
+    profile_file = profile_path('Runtime')
+    try:
+        profile = load_profile(profile_file)
+    except (ValueError, OSError) as e:
+        print(f"Could not read profile {profile_file}: {e}")
+        profile = None
+    if profile is not None:
+        try:
+            apply_settings(globals(), PROFILE_SETTINGS, profile, OPEN_TABLES)
+            print(f"Loaded profile {profile_file}")
+        except ValueError as e:
+            print(f"Could not apply profile {profile_file}: {e}")
+    if GAME_REGION is None:
+        GAME_REGION = BeanCounter.calibrate_game_region()
+        save_profile(profile_file, settings_profile(globals(), PROFILE_SETTINGS))
+    
+    sct = create_capture()
+    
+    if args.learn:
+        learn_screen(sct, args.learn)
+        save_profile(profile_file, settings_profile(globals(), PROFILE_SETTINGS))
+        return
+    
+    if len(SCREEN_SIGNATURES) == 0:
+        print("No screens learned yet. Run with --learn for each game and room, e.g.:")
+        print(f"  python ClubPenguinBot.py --learn {PLUGINS[0].GAME_NAME}")
+        print(f"  python ClubPenguinBot.py --learn {PLUGINS[0].ROOM_NAME}")
+        return
+    
+    # Share the runtime's region and each game's own tuning with the plugins
+    plugin_watchers = {}
+    for plugin in PLUGINS:
+        plugin_file = profile_path(plugin.GAME_NAME)
+        try:
+            plugin_profile = load_profile(plugin_file)
+        except (ValueError, OSError) as e:
+            print(f"Could not read profile {plugin_file}: {e}")
+            plugin_profile = None
+        try:
+            apply_plugin_profile(plugin, plugin_profile or {})
+        except ValueError as e:
+            print(f"Could not apply profile {plugin_file}: {e}")
+        plugin_watchers[plugin] = ProfileWatcher(plugin_file)
+        plugin.on_game_end = lambda plugin=plugin: finish_game(plugin)
+        plugin.event_log.start(plugin.DEBUG_LOG_FILE)
+    profile_watcher = ProfileWatcher(profile_file)
+    if ROTATION_ENABLED and not coin_rates_known():
+        print("Not switching games until COINS_PER_CATCH and COINS_PER_TRICK are set in the game profiles")
+    outcome_log.start()
+    # Debug output is written from a background thread so it can't stall the game loop
+    event_log.start(DEBUG_LOG_FILE)
+    
+    print("Club Penguin Minigame Bot")
+    print("-------------------------")
+    print(f"Games: {', '.join(PLUGINS_BY_GAME)}. Known screens: {', '.join(SCREEN_SIGNATURES)}")
+    print(f"Press {START_KEY} to start/stop")
+    print(f"Press {PAUSE_KEY} to pause/resume")
+    print(f"Press {DEBUG_KEY} to toggle debug mode")
+    print(f"Press {QUIT_KEY} to quit")
+    
+    # Start key listener in a separate thread
+    listener_thread = threading.Thread(target=cross_platform_key_listener)
+    listener_thread.daemon = True
+    listener_thread.start()
+    
+    try:
+        while not exit_program:
+            # Pick up profile edits between frames
+            profile = profile_watcher.take()
+            if profile is not None:
+                try:
+                    apply_settings(globals(), PROFILE_SETTINGS, profile, OPEN_TABLES)
+                    for plugin in PLUGINS:
+                        plugin.GAME_REGION = GAME_REGION
+                    print("Reloaded runtime profile")
+                except ValueError as e:
+                    print(f"Ignoring invalid runtime profile, keeping the previous settings: {e}")
+            for plugin, watcher in plugin_watchers.items():
+                plugin_profile = watcher.take()
+                if plugin_profile is not None:
+                    try:
+                        apply_plugin_profile(plugin, plugin_profile)
+                        print(f"Reloaded {plugin.GAME_NAME} profile")
+                    except ValueError as e:
+                        print(f"Ignoring invalid {plugin.GAME_NAME} profile, keeping the previous settings: {e}")
+            
+            if running and not paused:
+                try:
+                    # Check what is on screen: every frame while idle, now and then while playing
+                    now = time.time()
+                    if active_game is None or now - last_recognition > RECOGNITION_INTERVAL:
+                        last_recognition = now
+                        screen, score = recognise_screen(full_frame(sct), SCREEN_SIGNATURES)
+                        if screen is not None:
+                            dispatch(screen)
+                        elif active_game is None and debug_mode:
+                            event_log.log("Unrecognised screen (best match {:.2f})", score)
+                    
+                    if active_game is not None:
+                        plugin = active_game
+                        screenshot = sct.grab(plugin.capture_monitor())
+                        frame = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR)
+                        frame = cv2.resize(frame, (frame.shape[1]//plugin.DETECTION_SCALE, frame.shape[0]//plugin.DETECTION_SCALE))
+                        plugin.play_frame(frame)
+                    else:
+                        time.sleep(0.1)
+                except Exception as e:
+                    event_log.log("Error during gameplay: {}", e)
+                    if active_game is not None:
+                        active_game.errors += 1
+                    time.sleep(1)  # Pause briefly on error
+            
+            # Small delay to reduce CPU usage
+            time.sleep(0.01)
+    
+    except KeyboardInterrupt:
+        print("Bot terminated by user")
+    finally:
+        # Clean up
+        exit_program = True
+        for plugin in PLUGINS:
+            plugin.release_inputs()
+            plugin.event_log.stop()
+            plugin_watchers[plugin].stop()
+        profile_watcher.stop()
+        # A game that ended during shutdown never saw its restart finish
+        if finished_outcome is not None:
+            outcome_log.record(finished_outcome)
+        outcome_log.stop()
+        event_log.stop()
+        if debug_mode:
+            cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    # Check for required libraries
+    required_packages = ["pyautogui", "numpy", "opencv-python", "mss"]
+    missing_packages = []
+    
+    # Check each package
+    try:
+        import pyautogui
+    except ImportError:
+        missing_packages.append("pyautogui")
+    
+    try:
+        import numpy
+    except ImportError:
+        missing_packages.append("numpy")
+    
+    try:
+        import cv2
+    except ImportError:
+        missing_packages.append("opencv-python")
+    
+    try:
+        import mss
+    except ImportError:
+        missing_packages.append("mss")
+    
+    # Check for keyboard libraries
+    keyboard_lib_present = False
+    try:
+        import keyboard
+        keyboard_lib_present = True
+    except ImportError:
+        try:
+            from pynput import keyboard
+            keyboard_lib_present = True
+        except ImportError:
+            missing_packages.append("keyboard or pynput")
+    
+    # Report missing packages
+    if missing_packages:
+        print("Missing required libraries:")
+        for pkg in missing_packages:
+            print(f"  - {pkg}")
+        print("\nPlease install the required libraries using:")
+        print(f"pip install {' '.join(required_packages)} {'keyboard pynput' if not keyboard_lib_present else ''}")
+        sys.exit(1)
+    
+    # Check platform compatibility
+    current_platform = platform.system()
+    print(f"Running on {current_platform}")
+    
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark and check the screen capture backends.
+
+Usage (from the repository root):
+    python -m Common.CaptureBenchmark            # time mss against MIT-SHM at several region sizes
+    python -m Common.CaptureBenchmark --check    # draw a test pattern and check both backends read it back
+
+On a host without a display, run either under Xvfb:
+    xvfb-run -s "-screen 0 1920x1080x24" python -m Common.CaptureBenchmark --check
+"""
+import argparse
+import ctypes
+import time
+import numpy as np
+
+from Common.ScreenCapture import ShmCapture, MssCapture, _load_library
+
+REGION_SIZES = [(160, 120), (320, 240), (640, 480), (1280, 720), (1920, 1080)]
+TEST_COLORS = [(0x20, 0x40, 0x80), (0xF0, 0x10, 0x60), (0x00, 0xC0, 0x30)]  # BGR
+
+def time_backend(capture, monitor, frames):
+    """Mean milliseconds per frame, including the conversion to a numpy array."""
+    for _ in range(5):
+        capture.grab(monitor)
+    start = time.perf_counter()
+    for _ in range(frames):
+        capture.grab(monitor)
+    return (time.perf_counter() - start) * 1000 / frames
+
+def benchmark(frames):
+    backends = [('mss', MssCapture())]
+    try:
+        backends.append(('shm', ShmCapture()))
+    except OSError as e:
+        print(f"Shared-memory capture unavailable, only timing mss: {e}")
+
+    print(f"{'region':>10} " + " ".join(f"{name + ' ms':>9}" for name, _ in backends))
+    for width, height in REGION_SIZES:
+        monitor = {'left': 0, 'top': 0, 'width': width, 'height': height}
+        try:
+            timings = [time_backend(capture, monitor, frames) for _, capture in backends]
+        except Exception as e:
+            print(f"{width}x{height}: skipped ({e})")
+            continue
+        line = f"{width:>5}x{height:<4} " + " ".join(f"{timing:9.3f}" for timing in timings)
+        if len(timings) == 2:
+            line += f"   {timings[0] / timings[1]:.1f}x faster"
+        print(line)
+
+    for _, capture in backends:
+        capture.close()
+
+def draw_test_pattern(width, height):
+    """Fill vertical stripes of TEST_COLORS across the root window."""
+    x11 = _load_library('X11')
+    x11.XOpenDisplay.restype = ctypes.c_void_p
+    x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    x11.XDefaultRootWindow.restype = ctypes.c_ulong
+    x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+    x11.XCreateGC.restype = ctypes.c_void_p
+    x11.XCreateGC.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_void_p]
+    x11.XSetForeground.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_ulong]
+    x11.XSetSubwindowMode.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
+    x11.XFillRectangle.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_void_p,
+                                   ctypes.c_int, ctypes.c_int, ctypes.c_uint, ctypes.c_uint]
+    x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+
+    display = x11.XOpenDisplay(None)
+    root = x11.XDefaultRootWindow(display)
+    gc = x11.XCreateGC(display, root, 0, None)
+    x11.XSetSubwindowMode(display, gc, 1)  # IncludeInferiors
+    stripe = width // len(TEST_COLORS)
+    for index, (blue, green, red) in enumerate(TEST_COLORS):
+        x11.XSetForeground(display, gc, (red << 16) | (green << 8) | blue)
+        x11.XFillRectangle(display, root, gc, index * stripe, 0, stripe, height)
+    x11.XSync(display, 0)
+    return stripe
+
+def check(width, height):
+    """Check both backends return the same pixels, and that they match the drawn pattern."""
+    stripe = draw_test_pattern(width, height)
+    shm = ShmCapture()
+    mss_capture = MssCapture()
+    failures = 0
+
+    for region_width, region_height in REGION_SIZES + [(333, 201)]:  # Odd size exercises row padding
+        if region_width > width or region_height > height:
+            continue
+        monitor = {'left': 7, 'top': 3, 'width': region_width, 'height': region_height}
+        shm_frame = shm.grab(monitor)
+        mss_frame = mss_capture.grab(monitor)
+
+        matches = np.array_equal(shm_frame[:, :, :3], mss_frame[:, :, :3])
+        for index, color in enumerate(TEST_COLORS):
+            x = index * stripe + stripe // 2 - monitor['left']
+            if 0 <= x < region_width:
+                matches &= tuple(shm_frame[region_height // 2, x, :3]) == color
+        print(f"{region_width}x{region_height}: {'ok' if matches else 'MISMATCH'}")
+        failures += not matches
+
+    shm.close()
+    mss_capture.close()
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and check the screen capture backends")
+    parser.add_argument('--frames', type=int, default=200, help="Frames timed per region size")
+    parser.add_argument('--check', action='store_true', help="Draw a test pattern and check both backends read it back")
+    parser.add_argument('--screen', default='1920x1080', help="Screen size for --check")
+    args = parser.parse_args()
+
+    if args.check:
+        width, height = (int(value) for value in args.screen.split('x'))
+        raise SystemExit(1 if check(width, height) else 0)
+    benchmark(args.frames)
+
+if __name__ == "__main__":
+    main()
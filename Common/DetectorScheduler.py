@@ -0,0 +1,92 @@
+"""
+Running each detector only as often as it is needed, within a per-frame time budget.
+
+Critical detectors (hazards, corners) run on every frame before anything else. The others
+run highest priority first, as long as their measured cost still fits in the frame's budget,
+so a fast host runs everything on every frame. A detector that is skipped keeps returning its
+last result. Costs are measured on the host, so a slower host skips more instead of overrunning
+the budget, but never below a detector's min_rate: once its result is 1 / min_rate old it runs
+whatever the budget says.
+"""
+import time
+
+COST_SMOOTHING = 0.2  # Weight of the newest measurement in each detector's running cost estimate
+
+class Detector:
+    def __init__(self, name, function, priority, min_rate, critical):
+        self.name = name
+        self.function = function
+        self.priority = priority
+        self.interval = 0 if min_rate is None else 1 / min_rate
+        self.critical = critical
+        self.cost = 0.0
+        self.last_run = None
+        self.skipped = 0
+
+class DetectorScheduler:
+    def __init__(self, budget):
+        self.budget = budget  # Seconds per frame; critical detectors run even if they use it all
+        self.detectors = []
+        self.results = {}
+        self.initial = {}
+
+    def add(self, name, function, priority=0, min_rate=None, critical=False, initial=None):
+        """
+        Register a detector. function is called with the arguments given to run(). initial is
+        returned until it has run once. Higher priority detectors get the budget first.
+        With a min_rate, it runs at least that often (per second) even if that overruns the
+        budget; without one, it only runs when there is budget left.
+        """
+        if min_rate is not None and min_rate <= 0:
+            raise ValueError(f"{name}: min_rate must be positive, got {min_rate}")
+        self.detectors.append(Detector(name, function, priority, min_rate, critical))
+        self.detectors.sort(key=lambda detector: (not detector.critical, -detector.priority))
+        self.results[name] = initial
+        self.initial[name] = initial
+
+    def reset(self):
+        """Forget every result (e.g. when a new game starts), so each detector runs on the next frame."""
+        self.results.update(self.initial)
+        for detector in self.detectors:
+            detector.last_run = None
+
+    def _run(self, detector, args):
+        start = time.perf_counter()
+        self.results[detector.name] = detector.function(*args)
+        end = time.perf_counter()
+        detector.cost += COST_SMOOTHING * (end - start - detector.cost)
+        detector.last_run = end
+        return end
+
+    def run(self, *args):
+        """Run the detectors that are due this frame and return every detector's latest result."""
+        now = time.perf_counter()
+        deadline = now + self.budget
+        for detector in self.detectors:
+            if detector.critical:
+                now = self._run(detector, args)
+
+        for detector in self.detectors:
+            if detector.critical:
+                continue
+            due = detector.last_run is None or (detector.interval > 0 and now - detector.last_run >= detector.interval)
+            if not due and now + detector.cost > deadline:
+                detector.skipped += 1
+                continue
+            now = self._run(detector, args)
+
+        return self.results
+
+    def ran_at(self, name):
+        """
+        When a detector's current result was produced (time.perf_counter), or None before its
+        first run. A value that hasn't changed since the last frame means the result is a repeat.
+        """
+        for detector in self.detectors:
+            if detector.name == name:
+                return detector.last_run
+        raise KeyError(name)
+
+    def skipped(self):
+        """How many times each detector was left out of a frame for lack of budget."""
+        return {detector.name: detector.skipped for detector in self.detectors if not detector.critical}
@@ -0,0 +1,79 @@
+"""
+Debug logging that never blocks the game loop.
+
+The game thread only appends a (time, template, args) tuple to a bounded buffer; a
+background thread formats the records and writes them to stdout or a rotating file.
+When the buffer is full new records are dropped and counted instead of waiting.
+"""
+import sys
+import time
+import logging
+import logging.handlers
+import threading
+from collections import deque
+
+MAX_PENDING_EVENTS = 10000  # Records buffered before new ones are dropped
+FLUSH_INTERVAL = 0.05       # How often the writer wakes up to drain the buffer
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+class EventLog:
+    def __init__(self, name, max_pending=MAX_PENDING_EVENTS):
+        self.name = name
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.dropped = 0
+        self.reported_dropped = 0
+        self.writer = None
+        self.stopping = threading.Event()
+        self.logger = logging.getLogger(f"{name}.events")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def log(self, template, *args):
+        """Queue a record from the hot path. template is formatted with args later, on the writer thread."""
+        # deque appends are atomic, so the only cost here is building the tuple
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending.append((time.time(), template, args))
+
+    def start(self, path=None):
+        """Start the writer thread, writing to a rotating file at path or to stdout if path is None."""
+        if path is None:
+            handler = logging.StreamHandler(sys.stdout)
+        else:
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger.handlers = [handler]
+
+        self.stopping.clear()
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def stop(self):
+        """Write out anything still buffered and stop the writer thread."""
+        if self.writer is None:
+            return
+        self.stopping.set()
+        self.writer.join(timeout=2)
+        self.writer = None
+
+    def _write_loop(self):
+        while not self.stopping.wait(FLUSH_INTERVAL):
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        while self.pending:
+            timestamp, template, args = self.pending.popleft()
+            try:
+                message = template.format(*args)
+            except (IndexError, KeyError, ValueError) as e:
+                message = f"{template} {args} (format error: {e})"
+            clock = time.strftime('%H:%M:%S', time.localtime(timestamp))
+            self.logger.info(f"{clock}.{int(timestamp * 1000) % 1000:03d} {message}")
+
+        if self.dropped != self.reported_dropped:
+            self.logger.info(f"Dropped {self.dropped - self.reported_dropped} log events (buffer full)")
+            self.reported_dropped = self.dropped
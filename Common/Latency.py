@@ -0,0 +1,113 @@
+"""Input-to-screen latency measurement shared by the game scripts."""
+import time
+import random
+import numpy as np
+import cv2
+
+# Measurement settings
+LATENCY_SAMPLES = 15        # Number of probe inputs per calibration
+LATENCY_TIMEOUT = 1.0       # Give up on a probe if nothing changes within this many seconds
+LATENCY_SETTLE = 0.3        # Time to let the screen settle between probes
+NOISE_FRAMES = 8            # Idle frames sampled before each probe to learn background motion
+MIN_CHANGE_THRESHOLD = 3.0  # Minimum mean pixel difference that counts as a visible reaction
+
+def frame_difference(previous, current):
+    """Mean absolute per-pixel difference between two frames."""
+    return float(np.mean(cv2.absdiff(previous, current)))
+
+def measure_input_latency(grab, probe, samples=LATENCY_SAMPLES, timeout=LATENCY_TIMEOUT,
+                          settle=LATENCY_SETTLE, should_abort=None):
+    """
+    Send probe inputs and time how long each takes to visibly change the screen.
+    grab() must return the watched area as a numpy array and probe(index) sends one input.
+    Both are plain callables, so this works against a replayed or simulated screen as well
+    as the live game. Returns a list of latencies in seconds; probes that time out are left out.
+    """
+    latencies = []
+    
+    for index in range(samples):
+        if should_abort is not None and should_abort():
+            break
+        
+        # Sample the idle screen to learn how much it changes without any input
+        previous = grab()
+        noise = []
+        for _ in range(NOISE_FRAMES):
+            frame = grab()
+            noise.append(frame_difference(previous, frame))
+            previous = frame
+        threshold = max(MIN_CHANGE_THRESHOLD, np.mean(noise) + 4 * np.std(noise))
+        
+        # Send the probe and grab frames as fast as possible until the screen reacts
+        start = time.perf_counter()
+        probe(index)
+        while True:
+            grab_time = time.perf_counter()
+            if grab_time - start > timeout:
+                break
+            frame = grab()
+            if frame_difference(previous, frame) > threshold:
+                # The change appeared somewhere between the previous grab and this one
+                latencies.append(grab_time - start)
+                break
+            previous = frame
+        
+        time.sleep(settle)
+    
+    return latencies
+
+def summarize_latency(latencies):
+    """Return the median, 90th percentile, min and max of a latency distribution (in seconds)."""
+    if len(latencies) == 0:
+        return None
+    
+    values = np.array(latencies)
+    return {
+        'count': len(values),
+        'median': float(np.median(values)),
+        'p90': float(np.percentile(values, 90)),
+        'min': float(np.min(values)),
+        'max': float(np.max(values)),
+    }
+
+def format_latency(summary):
+    """Format a latency summary for printing."""
+    if summary is None:
+        return "No probe produced a visible reaction"
+    return (f"{summary['count']} samples: median {summary['median']*1000:.1f} ms, "
+            f"p90 {summary['p90']*1000:.1f} ms, "
+            f"range {summary['min']*1000:.1f}-{summary['max']*1000:.1f} ms")
+
+class SimulatedScreen:
+    """
+    Screen stand-in that switches between frames a fixed delay after each probe.
+    Feed it two recorded frames (e.g. penguin in the left and right lane) to check
+    the measurement offline against a known latency.
+    """
+    def __init__(self, frames, latency, jitter=0.0):
+        self.frames = frames
+        self.latency = latency
+        self.jitter = jitter
+        self.current = 0
+        self.pending = None  # (frame index, time it becomes visible)
+    
+    def probe(self, index):
+        delay = self.latency + random.uniform(0, self.jitter)
+        self.pending = ((self.current + 1) % len(self.frames), time.perf_counter() + delay)
+    
+    def grab(self):
+        if self.pending is not None and time.perf_counter() >= self.pending[1]:
+            self.current = self.pending[0]
+            self.pending = None
+        return self.frames[self.current]
+
+if __name__ == "__main__":
+    # Check the measurement against a simulated screen with a known latency
+    idle = np.zeros((120, 160, 3), dtype=np.uint8)
+    moved = idle.copy()
+    cv2.rectangle(moved, (60, 40), (100, 80), (255, 255, 255), -1)
+    
+    for expected in [0.03, 0.08, 0.15]:
+        screen = SimulatedScreen([idle, moved], expected, jitter=0.01)
+        summary = summarize_latency(measure_input_latency(screen.grab, screen.probe, samples=10, settle=0.05))
+        print(f"Simulated {expected*1000:.0f} ms (+0-10 ms jitter): {format_latency(summary)}")
@@ -0,0 +1,186 @@
+"""
+Per-game outcome history in a local SQLite database.
+
+Every finished game becomes one row: when it started and ended, how long the restart into the
+next game took, how many objects were detected, how many input events were sent, how many
+errors the loop caught, the estimated coins and the final score when one could be read. The
+game thread only queues the row; a background thread writes queued rows in one transaction
+every few seconds, so the database never costs the game loop a disk write.
+
+Rows carry the host name and a short hash of the game's tuning settings (leaving out calibrated
+values like the game region and input latency), so a report can compare hosts, or the same
+host before and after a settings change:
+    python -m Common.Outcomes                      # per day and host
+    python -m Common.Outcomes --by profile --period week --game BeanCounter
+"""
+import os
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from collections import deque
+
+OUTCOMES_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'outcomes.sqlite')
+WRITE_INTERVAL = 5.0  # Seconds between batched writes
+MAX_PENDING_GAMES = 1000
+
+COLUMNS = ['instance', 'profile', 'game', 'started', 'ended', 'restart_seconds',
+           'detections', 'actions', 'errors', 'coins', 'score']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    instance TEXT NOT NULL,
+    profile TEXT,
+    game TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL NOT NULL,
+    restart_seconds REAL,
+    detections INTEGER,
+    actions INTEGER,
+    errors INTEGER,
+    coins REAL,
+    score INTEGER
+);
+CREATE INDEX IF NOT EXISTS games_ended ON games (ended);
+"""
+
+def connect(path=OUTCOMES_DB):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+class OutcomeLog:
+    """Queues finished games and writes them to the database in batches from a background thread."""
+    def __init__(self, path=OUTCOMES_DB, instance=None):
+        self.path = path
+        self.instance = instance or socket.gethostname()
+        self.pending = deque(maxlen=MAX_PENDING_GAMES)
+        self.writer = None
+        self.stopping = threading.Event()
+
+    def record(self, outcome):
+        """
+        Queue one game. outcome is a dict with the game's columns (see COLUMNS); missing ones are
+        stored as NULL. Returns immediately.
+        """
+        self.pending.append(dict(outcome, instance=self.instance))
+
+    def start(self):
+        self.stopping.clear()
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def stop(self):
+        """Write anything still queued and stop the writer thread."""
+        if self.writer is None:
+            return
+        self.stopping.set()
+        self.writer.join(timeout=5)
+        self.writer = None
+
+    def _write_loop(self):
+        # sqlite connections belong to the thread that opened them
+        connection = connect(self.path)
+        try:
+            while not self.stopping.wait(WRITE_INTERVAL):
+                self._write(connection)
+            self._write(connection)
+        finally:
+            connection.close()
+
+    def _write(self, connection):
+        rows = []
+        while self.pending:
+            outcome = self.pending.popleft()
+            rows.append([outcome.get(column) for column in COLUMNS])
+        if not rows:
+            return
+        try:
+            with connection:
+                connection.executemany(
+                    f"INSERT INTO games ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+        except sqlite3.Error as e:
+            print(f"Could not write {len(rows)} game outcome(s) to {self.path}: {e}")
+
+PERIODS = {'day': '%Y-%m-%d', 'week': '%Y-W%W', 'month': '%Y-%m'}
+GROUPS = {'instance': 'instance', 'profile': "game || ' ' || COALESCE(profile, '?')", 'game': 'game'}
+
+def summarize(connection, by='instance', period='day', since=None, game=None):
+    """
+    Aggregate games per period and group. Returns dicts with games, hours played, coins per hour
+    (counting restarts as time spent), mean game length and restart time, restart overhead as a
+    fraction of the time spent, errors per game, input events per minute and mean score.
+    """
+    conditions, parameters = [], [PERIODS[period]]
+    if since is not None:
+        conditions.append("ended >= ?")
+        parameters.append(since)
+    if game is not None:
+        conditions.append("game = ?")
+        parameters.append(game)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    query = f"""
+        SELECT strftime(?, ended, 'unixepoch', 'localtime') AS period, {GROUPS[by]} AS grp,
+               COUNT(*), SUM(ended - started), SUM(COALESCE(restart_seconds, 0)), COUNT(restart_seconds),
+               SUM(coins), SUM(errors), SUM(actions), AVG(score)
+        FROM games {where}
+        GROUP BY period, grp ORDER BY period, grp
+    """
+    summaries = []
+    for period_name, group, games, played, restarting, restarts, coins, errors, actions, score in connection.execute(query, parameters):
+        spent = played + restarting
+        summaries.append({
+            'period': period_name,
+            'group': group,
+            'games': games,
+            'hours': played / 3600,
+            'coins_per_hour': (coins or 0) / spent * 3600 if spent > 0 else 0.0,
+            'game_seconds': played / games,
+            'restart_seconds': restarting / restarts if restarts else None,
+            'restart_overhead': restarting / spent if spent > 0 else 0.0,
+            'errors_per_game': (errors or 0) / games,
+            'actions_per_minute': (actions or 0) / played * 60 if played > 0 else 0.0,
+            'score': score,
+        })
+    return summaries
+
+def format_summary(summaries):
+    lines = [f"{'period':<10} {'group':<28} {'games':>5} {'hours':>6} {'coins/h':>8} {'game s':>7} "
+             f"{'restart s':>9} {'overhead':>8} {'err/game':>8} {'inputs/min':>10} {'score':>6}"]
+    for row in summaries:
+        restart = f"{row['restart_seconds']:9.1f}" if row['restart_seconds'] is not None else f"{'-':>9}"
+        score = f"{row['score']:6.0f}" if row['score'] is not None else f"{'-':>6}"
+        lines.append(f"{row['period']:<10} {row['group'][:28]:<28} {row['games']:5d} {row['hours']:6.2f} "
+                     f"{row['coins_per_hour']:8.0f} {row['game_seconds']:7.0f} {restart} "
+                     f"{row['restart_overhead']:8.0%} {row['errors_per_game']:8.2f} {row['actions_per_minute']:10.0f} {score}")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report throughput, game length and restart overhead from the outcome database")
+    parser.add_argument('--db', default=OUTCOMES_DB, help="Outcome database (default: %(default)s)")
+    parser.add_argument('--by', choices=list(GROUPS), default='instance', help="Group rows by host, by game and profile settings, or by game")
+    parser.add_argument('--period', choices=list(PERIODS), default='day')
+    parser.add_argument('--days', type=float, help="Only include games that ended in the last DAYS days")
+    parser.add_argument('--game', help="Only include this game")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"No outcome database at {args.db} yet; it is created after the first finished game")
+        return
+    since = time.time() - args.days * 86400 if args.days is not None else None
+    connection = connect(args.db)
+    try:
+        summaries = summarize(connection, args.by, args.period, since, args.game)
+    finally:
+        connection.close()
+
+    if not summaries:
+        print("No games recorded for this selection")
+        return
+    print(format_summary(summaries))
+
+if __name__ == "__main__":
+    main()
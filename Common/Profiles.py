@@ -0,0 +1,177 @@
+"""
+Per-host tuning profiles.
+
+A profile is a JSON (or TOML, on Python 3.11+) file mapping a game script's setting names
+(GAME_REGION, DETECTION_SCALE, colour bounds, timing windows, button positions...) to values.
+It lives in profiles/<hostname>-<game>.json and is written after the first calibration, so
+later starts skip the prompt. ProfileWatcher notices edits while the bot runs; the game loop
+picks the new profile up between frames, so a frame never sees half a profile.
+"""
+import os
+import json
+import socket
+import hashlib
+import threading
+import numpy as np
+
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'profiles')
+WATCH_INTERVAL = 1.0  # Seconds between checks for profile changes
+
+def profile_path(game):
+    """Path of this host's profile for a game, preferring an existing TOML file over JSON."""
+    base = os.path.join(PROFILES_DIR, f"{socket.gethostname()}-{game}")
+    if os.path.exists(base + '.toml'):
+        return base + '.toml'
+    return base + '.json'
+
+def load_profile(path):
+    """Read a profile, returning None if it doesn't exist."""
+    if not os.path.exists(path):
+        return None
+
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError("TOML profiles need Python 3.11 or later, use a .json profile instead") from None
+        with open(path, 'rb') as file:
+            return tomllib.load(file)
+    with open(path) as file:
+        return json.load(file)
+
+def save_profile(path, profile):
+    """Write a JSON profile atomically, so a watcher never reads a half-written file."""
+    if path.endswith('.toml'):
+        print(f"Not saving settings to {path}, TOML profiles are edited by hand")
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(profile, file, indent=4)
+    os.replace(temporary, path)
+
+class ProfileWatcher:
+    """Re-reads a profile in the background whenever its modification time changes."""
+    def __init__(self, path):
+        self.path = path
+        self.mtime = self._mtime()
+        self.profile = None
+        self.version = 0
+        self.taken_version = 0
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._watch, daemon=True)
+        self.thread.start()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _watch(self):
+        while not self.stopping.wait(WATCH_INTERVAL):
+            mtime = self._mtime()
+            if mtime is None or mtime == self.mtime:
+                continue
+            self.mtime = mtime
+            try:
+                self.profile = load_profile(self.path)
+                # Bumped after the profile is in place, so take() never sees a new version without it
+                self.version += 1
+            except (ValueError, OSError) as e:
+                print(f"Ignoring invalid profile {self.path}: {e}")
+
+    def take(self):
+        """Return a profile that changed since the last call, or None. Cheap enough to call every frame."""
+        if self.version == self.taken_version:
+            return None
+        self.taken_version = self.version
+        return self.profile
+
+    def saved(self):
+        """Note that the bot itself just wrote the profile, so it isn't reloaded."""
+        self.mtime = self._mtime()
+
+    def stop(self):
+        self.stopping.set()
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, tuple):
+        return [_to_json(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    return value
+
+def _like(value, current):
+    """
+    Convert a value read from a profile back to the type of the setting it replaces, raising
+    ValueError if it can't stand in for it (wrong type, array shape, tuple length or table keys).
+    An empty table accepts any keys.
+    """
+    if current is None:
+        return tuple(value) if isinstance(value, list) else value
+    if isinstance(current, np.ndarray):
+        converted = np.array(value, dtype=current.dtype)
+        if converted.shape != current.shape:
+            raise ValueError(f"expected shape {current.shape}, got {converted.shape}")
+        return converted
+    if isinstance(current, dict):
+        if not isinstance(value, dict):
+            raise ValueError(f"expected a table, got {value!r}")
+        if current and set(value) != set(current):
+            raise ValueError(f"expected the keys {sorted(current)}, got {sorted(value)}")
+        return {key: _like(item, current.get(key)) for key, item in value.items()}
+    if isinstance(current, tuple):
+        if not isinstance(value, list) or len(value) != len(current):
+            raise ValueError(f"expected a list of {len(current)}, got {value!r}")
+        return tuple(_like(item, old) for item, old in zip(value, current))
+    if isinstance(current, bool):
+        if not isinstance(value, bool):
+            raise ValueError(f"expected true or false, got {value!r}")
+        return value
+    if isinstance(current, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"expected a number, got {value!r}")
+        if isinstance(current, int) and not float(value).is_integer():
+            raise ValueError(f"expected a whole number, got {value!r}")
+        return type(current)(value)
+    if isinstance(current, str) and not isinstance(value, str):
+        raise ValueError(f"expected a string, got {value!r}")
+    return value
+
+def _equal(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(a, b)
+    return a == b
+
+def settings_profile(settings, names):
+    """Collect the named settings from a module's globals() into a JSON-friendly profile."""
+    return {name: _to_json(settings[name]) for name in names}
+
+def profile_id(profile):
+    """Short hash identifying a set of settings, to tell results of different tunings apart."""
+    text = json.dumps(profile, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:8]
+
+def apply_settings(settings, names, profile, open_tables=()):
+    """
+    Copy a profile into a module's globals(), returning the names whose values changed.
+    Every value is checked first; if any is invalid, ValueError is raised and nothing changes.
+    A table setting must keep its keys unless it is named in open_tables.
+    """
+    updates = {}
+    for name, value in profile.items():
+        if name not in names:
+            print(f"Ignoring unknown profile setting: {name}")
+            continue
+        try:
+            value = _like(value, {} if name in open_tables else settings[name])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{name}: {e}") from e
+        if not _equal(value, settings[name]):
+            updates[name] = value
+    settings.update(updates)
+    return list(updates)
@@ -0,0 +1,78 @@
+"""Recording of the frames a bot sees, for offline tuning."""
+import os
+import time
+import threading
+import numpy as np
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'recordings')
+MAX_RECORDING_BYTES = 512 * 1024 * 1024  # Stop adding frames past this much frame data to keep memory bounded
+
+class FrameRecorder:
+    """Collects the downscaled frames the bot works on and saves them as a compressed .npz file."""
+    def __init__(self, game, max_bytes=MAX_RECORDING_BYTES):
+        self.game = game
+        self.max_bytes = max_bytes
+        self.recording = False
+        self.frames = []
+        self.times = []
+        self.recorded_bytes = 0
+        self.full = False
+        # toggle() runs on the key listener thread while add() runs on the game thread
+        self.lock = threading.Lock()
+    
+    def toggle(self):
+        """Start a new recording, or stop the current one and save it in the background."""
+        with self.lock:
+            if self.recording:
+                self.recording = False
+                frames, times, full = self.frames, self.times, self.full
+                self.frames, self.times = [], []
+                self.recorded_bytes = 0
+                self.full = False
+            else:
+                self.recording = True
+                frames = None
+        
+        if frames is None:
+            print("Recording started")
+        else:
+            threading.Thread(target=self.save, args=(frames, times, full), daemon=True).start()
+    
+    def add(self, frame):
+        """Add a frame if recording. Called from the game loop, so it only stores a reference."""
+        if not self.recording:
+            return
+        with self.lock:
+            if not self.recording or self.recorded_bytes + frame.nbytes > self.max_bytes:
+                self.full = self.recording
+                return
+            self.frames.append(frame)
+            self.times.append(time.time())
+            self.recorded_bytes += frame.nbytes
+    
+    def save(self, frames, times, full=False):
+        if len(frames) == 0:
+            print("Recording stopped, no frames captured")
+            return
+        if full:
+            print(f"Recording reached its {self.max_bytes // (1024 * 1024)} MB limit, later frames were not kept")
+        
+        # Copy into one array frame by frame, releasing each frame as it goes, so the
+        # recording is never held twice. Frames of another size (a DETECTION_SCALE change) are left out.
+        shape = frames[0].shape
+        kept = [index for index, frame in enumerate(frames) if frame.shape == shape]
+        stacked = np.empty((len(kept),) + shape, dtype=frames[0].dtype)
+        for position, index in enumerate(kept):
+            stacked[position] = frames[index]
+            frames[index] = None
+        times = np.array(times)[kept]
+        
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
+        path = os.path.join(RECORDINGS_DIR, f"{self.game}-{time.strftime('%Y%m%d-%H%M%S')}.npz")
+        np.savez_compressed(path, frames=stacked, times=times, game=self.game)
+        print(f"Recording saved: {path} ({len(kept)} frames)")
+
+def load_recording(path):
+    """Load a recording, returning (frames, times)."""
+    data = np.load(path)
+    return data['frames'], data['times']
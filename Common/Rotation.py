@@ -0,0 +1,46 @@
+"""Choosing which game to play next from the coins per hour each has earned."""
+import random
+
+MIN_GAMES = 3          # Games of each kind to play before trusting its rate
+EXPLORE_CHANCE = 0.1   # Chance of re-measuring a game that isn't currently the best
+
+class RotationSchedule:
+    def __init__(self, games, min_games=MIN_GAMES, explore_chance=EXPLORE_CHANCE):
+        self.games = list(games)
+        self.min_games = min_games
+        self.explore_chance = explore_chance
+        self.coins = {game: 0.0 for game in self.games}
+        self.seconds = {game: 0.0 for game in self.games}
+        self.played = {game: 0 for game in self.games}
+
+    def record_game(self, game, coins, seconds):
+        """Record a finished game: coins earned and seconds spent playing it."""
+        self.coins[game] += coins
+        self.seconds[game] += seconds
+        self.played[game] += 1
+
+    def record_restart(self, game, seconds):
+        """Record time spent between games (exiting, travelling, starting) against the game that followed."""
+        self.seconds[game] += seconds
+
+    def rate(self, game):
+        """Coins per hour earned by a game, including its restart overhead."""
+        if self.seconds[game] == 0:
+            return 0.0
+        return self.coins[game] / self.seconds[game] * 3600
+
+    def next_game(self, current):
+        """Pick the game to play next."""
+        # Measure every game a few times first, starting with the current one to avoid travelling
+        unmeasured = [game for game in self.games if self.played[game] < self.min_games]
+        if unmeasured:
+            return current if current in unmeasured else unmeasured[0]
+
+        best = max(self.games, key=self.rate)
+        others = [game for game in self.games if game != best]
+        if others and random.random() < self.explore_chance:
+            return random.choice(others)
+        return best
+
+    def summary(self):
+        return ", ".join(f"{game}: {self.rate(game):.0f} coins/h over {self.played[game]} games" for game in self.games)
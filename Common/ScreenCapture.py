@@ -0,0 +1,212 @@
+"""
+Screen capture backends.
+
+Both backends return the captured region as a BGRA numpy array. On Linux/X11 the MIT-SHM
+backend keeps one shared-memory segment per region size and returns a view onto it, so a
+frame costs one server-side copy and no allocations. The returned array is overwritten by
+the next grab; copy it if it has to outlive the frame. Everywhere else mss is used.
+"""
+import os
+import sys
+import ctypes
+import ctypes.util
+import numpy as np
+
+# Xlib constants
+Z_PIXMAP = 2
+ALL_PLANES = 0xFFFFFFFF
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+
+MAX_SEGMENTS = 4  # Region sizes kept attached at once (e.g. a full-region check and a game's crop)
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ('shmseg', ctypes.c_ulong),
+        ('shmid', ctypes.c_int),
+        ('shmaddr', ctypes.c_void_p),
+        ('readOnly', ctypes.c_int),
+    ]
+
+class XImage(ctypes.Structure):
+    # Only the leading fields are needed; the struct is always used through Xlib's pointer
+    _fields_ = [
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('xoffset', ctypes.c_int),
+        ('format', ctypes.c_int),
+        ('data', ctypes.c_void_p),
+        ('byte_order', ctypes.c_int),
+        ('bitmap_unit', ctypes.c_int),
+        ('bitmap_bit_order', ctypes.c_int),
+        ('bitmap_pad', ctypes.c_int),
+        ('depth', ctypes.c_int),
+        ('bytes_per_line', ctypes.c_int),
+        ('bits_per_pixel', ctypes.c_int),
+    ]
+
+X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+def _load_library(name):
+    path = ctypes.util.find_library(name)
+    if path is None:
+        raise OSError(f"lib{name} not found")
+    return ctypes.CDLL(path)
+
+class ShmCapture:
+    """Screen capture through the X11 MIT-SHM extension into a persistent shared-memory segment."""
+    def __init__(self, display_name=None):
+        self.x11 = _load_library('X11')
+        self.xext = _load_library('Xext')
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._declare_functions()
+
+        self.display = self.x11.XOpenDisplay(display_name.encode() if display_name else None)
+        if not self.display:
+            raise OSError("Cannot open X display")
+        if not self.xext.XShmQueryExtension(self.display):
+            self.x11.XCloseDisplay(self.display)
+            raise OSError("X server does not support MIT-SHM")
+
+        # Xlib's default handler exits the process, so record errors instead
+        self.x_error = None
+        def on_error(display, event):
+            self.x_error = True
+            return 0
+        self._error_handler = X_ERROR_HANDLER(on_error)
+        self.x11.XSetErrorHandler(self._error_handler)
+
+        screen = self.x11.XDefaultScreen(self.display)
+        self.root = self.x11.XDefaultRootWindow(self.display)
+        self.visual = self.x11.XDefaultVisual(self.display, screen)
+        self.depth = self.x11.XDefaultDepth(self.display, screen)
+
+        self.segments = {}  # (width, height) -> (image, shminfo, view)
+
+    def _declare_functions(self):
+        x11, xext, libc = self.x11, self.xext, self.libc
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        x11.XSetErrorHandler.restype = ctypes.c_void_p
+        x11.XSetErrorHandler.argtypes = [X_ERROR_HANDLER]
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+        xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                         ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint]
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage),
+                                      ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def _allocate(self, width, height):
+        """Create the shared image and segment for a region size, dropping the oldest if too many are attached."""
+        if len(self.segments) >= MAX_SEGMENTS:
+            self._release(next(iter(self.segments)))
+
+        shminfo = XShmSegmentInfo()
+        image = self.xext.XShmCreateImage(self.display, self.visual, self.depth, Z_PIXMAP, None,
+                                          ctypes.byref(shminfo), width, height)
+        if not image:
+            raise OSError("XShmCreateImage failed")
+        if image.contents.bits_per_pixel != 32:
+            self.x11.XFree(image)
+            raise OSError(f"Unsupported pixel format: {image.contents.bits_per_pixel} bits per pixel")
+
+        size = image.contents.bytes_per_line * image.contents.height
+        shminfo.shmid = self.libc.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            self.x11.XFree(image)
+            raise OSError(ctypes.get_errno(), "shmget failed")
+
+        address = self.libc.shmat(shminfo.shmid, None, 0)
+        if address is None or address == ctypes.c_void_p(-1).value:
+            self.libc.shmctl(shminfo.shmid, IPC_RMID, None)
+            self.x11.XFree(image)
+            raise OSError(ctypes.get_errno(), "shmat failed")
+        shminfo.shmaddr = address
+        shminfo.readOnly = 0
+        image.contents.data = address
+
+        self.x_error = None
+        self.xext.XShmAttach(self.display, ctypes.byref(shminfo))
+        self.x11.XSync(self.display, 0)
+        # The segment is freed once both sides detach, even if the process dies
+        self.libc.shmctl(shminfo.shmid, IPC_RMID, None)
+        if self.x_error:
+            self.libc.shmdt(address)
+            self.x11.XFree(image)
+            raise OSError("XShmAttach failed (is the X server remote?)")
+
+        # Zero-copy view of the segment, cropped to the pixels when rows are padded
+        buffer = (ctypes.c_ubyte * size).from_address(address)
+        rows = np.frombuffer(buffer, dtype=np.uint8).reshape(height, image.contents.bytes_per_line)
+        view = rows[:, :width * 4].reshape(height, width, 4)
+        self.segments[(width, height)] = (image, shminfo, view)
+
+    def _release(self, size):
+        image, shminfo, view = self.segments.pop(size)
+        self.xext.XShmDetach(self.display, ctypes.byref(shminfo))
+        self.x11.XSync(self.display, 0)
+        self.libc.shmdt(shminfo.shmaddr)
+        self.x11.XFree(image)
+
+    def grab(self, monitor):
+        """Capture a monitor dict (left, top, width, height) into the shared segment and return a BGRA view."""
+        size = (monitor['width'], monitor['height'])
+        if size not in self.segments:
+            self._allocate(*size)
+        image, shminfo, view = self.segments[size]
+
+        self.x_error = None
+        if not self.xext.XShmGetImage(self.display, self.root, image, monitor['left'], monitor['top'], ALL_PLANES) or self.x_error:
+            raise OSError(f"XShmGetImage failed for {monitor} (is the region on screen?)")
+        return view
+
+    def close(self):
+        for size in list(self.segments):
+            self._release(size)
+        if self.display:
+            self.x11.XCloseDisplay(self.display)
+            self.display = None
+
+class MssCapture:
+    """Screen capture through mss, which allocates a new image for every grab."""
+    def __init__(self):
+        import mss
+        self.sct = mss.mss()
+
+    def grab(self, monitor):
+        """Capture a monitor dict (left, top, width, height) and return it as a BGRA array."""
+        # asarray wraps the fresh mss buffer instead of copying it again
+        return np.asarray(self.sct.grab(monitor))
+
+    def close(self):
+        self.sct.close()
+
+def create_capture():
+    """Use the MIT-SHM backend when running under X11, otherwise fall back to mss."""
+    if sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+        try:
+            capture = ShmCapture()
+            print("Using X11 shared-memory screen capture")
+            return capture
+        except OSError as e:
+            print(f"Shared-memory capture unavailable: {e}")
+
+    print("Using mss screen capture")
+    return MssCapture()
@@ -0,0 +1,35 @@
+"""
+Recognising which game or room is on screen.
+
+A screen's signature is a coarse colour histogram of the whole game region. Signatures are
+learned once per host (python ClubPenguinBot.py --learn <name>) and a frame is recognised as
+the learned screen whose histogram it correlates with best.
+"""
+import cv2
+import numpy as np
+
+SIGNATURE_SIZE = (64, 40)      # The frame is shrunk to this before the histogram is taken
+SIGNATURE_BINS = [8, 8, 8]     # Histogram bins per BGR channel
+RECOGNITION_THRESHOLD = 0.8    # Minimum histogram correlation to accept a match
+
+def screen_signature(frame):
+    """Normalised colour histogram of a BGR frame, as a flat float32 array."""
+    small = cv2.resize(frame, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+    histogram = cv2.calcHist([small], [0, 1, 2], None, SIGNATURE_BINS, [0, 256, 0, 256, 0, 256])
+    return cv2.normalize(histogram, None).flatten()
+
+def recognise_screen(frame, signatures, threshold=RECOGNITION_THRESHOLD):
+    """
+    Return (name, score) for the learned screen that best matches the frame, or (None, score)
+    if nothing matches well enough. signatures maps names to lists from screen_signature.
+    """
+    signature = screen_signature(frame)
+    best_name, best_score = None, -1.0
+    for name, learned in signatures.items():
+        score = cv2.compareHist(signature, np.asarray(learned, dtype=np.float32), cv2.HISTCMP_CORREL)
+        if score > best_score:
+            best_name, best_score = name, score
+
+    if best_score < threshold:
+        return None, best_score
+    return best_name, best_score
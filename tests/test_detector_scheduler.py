@@ -0,0 +1,89 @@
+import types
+import unittest
+from unittest import mock
+
+from Common import DetectorScheduler as scheduling
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+class DetectorSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(scheduling, 'time', types.SimpleNamespace(perf_counter=self.clock.perf_counter))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+
+    def detector(self, name, cost):
+        """A detector that takes cost seconds and returns how many times it has run."""
+        def run():
+            self.clock.now += cost
+            self.calls.append(name)
+            return self.calls.count(name)
+        return run
+
+    def frames(self, scheduler, count, frame_seconds):
+        for _ in range(count):
+            scheduler.run()
+            self.clock.now += frame_seconds
+
+    def test_runs_every_frame_when_the_budget_allows(self):
+        scheduler = scheduling.DetectorScheduler(budget=0.01)
+        scheduler.add('bags', self.detector('bags', 0.001), min_rate=2)
+        self.frames(scheduler, 10, 0.01)
+        self.assertEqual(self.calls.count('bags'), 10)
+        self.assertEqual(scheduler.skipped(), {'bags': 0})
+
+    def test_critical_detectors_always_run_first(self):
+        scheduler = scheduling.DetectorScheduler(budget=0.0)
+        scheduler.add('bags', self.detector('bags', 0.001), priority=5, min_rate=1)
+        scheduler.add('hazards', self.detector('hazards', 0.001), critical=True)
+        self.frames(scheduler, 3, 0.01)
+        self.assertEqual(self.calls[:2], ['hazards', 'bags'])
+        self.assertEqual(self.calls.count('hazards'), 3)
+
+    def test_skips_over_budget_and_keeps_the_last_result(self):
+        scheduler = scheduling.DetectorScheduler(budget=0.005)
+        scheduler.add('cheap', self.detector('cheap', 0.001), priority=1)
+        scheduler.add('costly', self.detector('costly', 0.05), initial='none')
+        # The first frame runs everything, so costs are known
+        scheduler.run()
+        self.clock.now += 0.02
+        ran_at = scheduler.ran_at('costly')
+
+        results = scheduler.run()
+        self.assertEqual(results['costly'], 1)
+        self.assertEqual(scheduler.ran_at('costly'), ran_at)
+        self.assertEqual(scheduler.skipped()['costly'], 1)
+
+    def test_min_rate_is_a_floor_over_budget(self):
+        scheduler = scheduling.DetectorScheduler(budget=0.0)
+        scheduler.add('earnings', self.detector('earnings', 0.001), min_rate=10)
+        scheduler.add('spare', self.detector('spare', 0.001))
+        # 0.5s of 10ms frames with no budget: earnings every 100ms, the other only once
+        self.frames(scheduler, 50, 0.01)
+        self.assertGreaterEqual(self.calls.count('earnings'), 5)
+        self.assertEqual(self.calls.count('spare'), 1)
+
+    def test_reset_reruns_everything(self):
+        scheduler = scheduling.DetectorScheduler(budget=0.0)
+        scheduler.add('earnings', self.detector('earnings', 0.001), min_rate=1, initial=0)
+        scheduler.run()
+        scheduler.reset()
+        self.assertIsNone(scheduler.ran_at('earnings'))
+        self.assertEqual(scheduler.results['earnings'], 0)
+        scheduler.run()
+        self.assertEqual(self.calls.count('earnings'), 2)
+
+    def test_rejects_non_positive_rates(self):
+        scheduler = scheduling.DetectorScheduler(budget=0.01)
+        with self.assertRaises(ValueError):
+            scheduler.add('bags', self.detector('bags', 0.001), min_rate=0)
+
+if __name__ == '__main__':
+    unittest.main()
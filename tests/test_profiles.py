@@ -0,0 +1,58 @@
+import builtins
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from Common import Profiles
+
+class ApplySettingsTest(unittest.TestCase):
+    def setUp(self):
+        self.settings = {
+            'SCALE': 4,
+            'COLOR': np.array([1, 2, 3]),
+            'BUTTONS': {'exit': (0.5, 0.4), 'start': (0.8, 0.7)},
+            'ROOMS': {},
+        }
+        self.names = list(self.settings)
+
+    def test_applies_and_reports_changes(self):
+        changed = Profiles.apply_settings(self.settings, self.names, {'SCALE': 2, 'COLOR': [1, 2, 3]})
+        self.assertEqual(changed, ['SCALE'])
+        self.assertEqual(self.settings['SCALE'], 2)
+
+    def test_invalid_value_changes_nothing(self):
+        with self.assertRaises(ValueError):
+            Profiles.apply_settings(self.settings, self.names, {'SCALE': 2, 'COLOR': [1, 2]})
+        self.assertEqual(self.settings['SCALE'], 4)
+
+    def test_table_must_keep_its_keys(self):
+        with self.assertRaisesRegex(ValueError, 'BUTTONS'):
+            Profiles.apply_settings(self.settings, self.names, {'BUTTONS': {'exit': [0.5, 0.4]}})
+        self.assertIn('start', self.settings['BUTTONS'])
+
+    def test_open_tables_take_any_keys(self):
+        self.settings['ROOMS'] = {'map': (0.1, 0.2)}
+        Profiles.apply_settings(self.settings, self.names, {'ROOMS': {'Dock': [0.3, 0.4]}}, open_tables=['ROOMS'])
+        self.assertEqual(self.settings['ROOMS'], {'Dock': (0.3, 0.4)})
+
+class LoadProfileTest(unittest.TestCase):
+    def test_toml_without_tomllib_is_a_value_error(self):
+        real_import = builtins.__import__
+        def without_tomllib(name, *args, **kwargs):
+            if name == 'tomllib':
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'host-Game.toml')
+            with open(path, 'w') as file:
+                file.write('DETECTION_SCALE = 2\n')
+            with mock.patch.object(builtins, '__import__', without_tomllib):
+                with self.assertRaises(ValueError):
+                    Profiles.load_profile(path)
+
+if __name__ == '__main__':
+    unittest.main()